@@ -253,6 +253,18 @@ const UserRow = ({ user, onDelete }) => {
   );
 };
 
+// Follows the X-Continue header of paginated admin endpoints until the last page
+async function fetchAllPages(url, headers) {
+  const items = [];
+  let next = null;
+  do {
+    const res = await axios.get(url, { headers, params: next ? { continue: next } : undefined });
+    items.push(...res.data);
+    next = res.headers['x-continue'];
+  } while (next);
+  return items;
+}
+
 function AdminDashboard() {
   const navigate = useNavigate();
   const [stats, setStats] = useState(null);
@@ -270,14 +282,14 @@ function AdminDashboard() {
   const fetchData = useCallback(async () => {
     setLoading(true);
     try {
-      const [statsRes, companiesRes, usersRes] = await Promise.all([
+      const [statsRes, companiesList, usersList] = await Promise.all([
         axios.get(`${BACKEND_URL}/admin/stats`, { headers }),
-        axios.get(`${BACKEND_URL}/admin/companies`, { headers }),
-        axios.get(`${BACKEND_URL}/admin/users`, { headers })
+        fetchAllPages(`${BACKEND_URL}/admin/companies`, headers),
+        fetchAllPages(`${BACKEND_URL}/admin/users`, headers)
       ]);
       setStats(statsRes.data);
-      setCompanies(companiesRes.data);
-      setUsers(usersRes.data);
+      setCompanies(companiesList);
+      setUsers(usersList);
     } catch (error) {
       console.error('Error fetching admin data:', error);
       if (error.response?.status === 403 || error.response?.status === 401) {
@@ -0,0 +1,913 @@
+"""
+In-memory stand-in for the Kubernetes API server, for benchmarks and local runs.
+
+    cd backend
+    python -m benchmarks.fake_apiserver --port 8001 --kubeconfig /tmp/fake-kubeconfig \\
+        --tenants 20 --deployments 5 --replicas 2 --latency-ms 5 --jitter-ms 5
+    KUBECONFIG=/tmp/fake-kubeconfig CLUSTER_CACHE_ENABLED=true uvicorn main:app
+
+It serves the part of the REST API the backend uses:
+- core/v1 (namespaces, nodes, pods, pod logs, services, secrets, configmaps,
+  persistentvolumeclaims), apps/v1 (deployments, replicasets), networking.k8s.io/v1
+  (ingresses), autoscaling/v1 (horizontalpodautoscalers), batch/v1 (jobs, cronjobs) and
+  metrics.k8s.io/v1beta1 (pods, nodes; usage is synthesized from the running pods)
+- get/list/create/replace/patch/delete, equality label selectors, limit/continue,
+  PartialObjectMetadataList, and watch with resourceVersion, bookmarks and
+  410 Expired once a resourceVersion has left the event history (--history)
+- a small controller: a Deployment gets a ReplicaSet (pod-template-hash) and Running pods
+  with owner references; deletes cascade along owner references and namespaces; a
+  template change rolls the pods; deleted pods of a ReplicaSet are replaced
+- latency and error injection for every request, or per rule:
+  --rule "GET /api/v1/namespaces/[^/]+/pods$ latency=200 errors=0.05 status=503"
+
+Continue tokens page through the current state after the last returned key instead of a
+snapshot, and strategic-merge patches are applied as JSON merge patches (lists replaced).
+Both are good enough for the backend; neither is exactly what a real API server does.
+
+FakeApiServer is also usable from Python (benchmarks.load starts one in-process).
+"""
+import argparse
+import base64
+import copy
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+from k8s_cache import labels_match, parse_label_selector
+
+
+class Resource(NamedTuple):
+    prefix: str  # /api/v1 or /apis/<group>/<version>
+    plural: str
+    kind: str
+    namespaced: bool
+
+    @property
+    def api_version(self) -> str:
+        return self.prefix.split("/", 2)[2]
+
+
+RESOURCES = {(r.prefix, r.plural): r for r in [
+    Resource("/api/v1", "namespaces", "Namespace", False),
+    Resource("/api/v1", "nodes", "Node", False),
+    Resource("/api/v1", "pods", "Pod", True),
+    Resource("/api/v1", "services", "Service", True),
+    Resource("/api/v1", "secrets", "Secret", True),
+    Resource("/api/v1", "configmaps", "ConfigMap", True),
+    Resource("/api/v1", "persistentvolumeclaims", "PersistentVolumeClaim", True),
+    Resource("/apis/apps/v1", "deployments", "Deployment", True),
+    Resource("/apis/apps/v1", "replicasets", "ReplicaSet", True),
+    Resource("/apis/networking.k8s.io/v1", "ingresses", "Ingress", True),
+    Resource("/apis/autoscaling/v1", "horizontalpodautoscalers", "HorizontalPodAutoscaler", True),
+    Resource("/apis/batch/v1", "jobs", "Job", True),
+    Resource("/apis/batch/v1", "cronjobs", "CronJob", True),
+]}
+NAMESPACES = RESOURCES[("/api/v1", "namespaces")]
+NODES = RESOURCES[("/api/v1", "nodes")]
+PODS = RESOURCES[("/api/v1", "pods")]
+SECRETS = RESOURCES[("/api/v1", "secrets")]
+SERVICES = RESOURCES[("/api/v1", "services")]
+DEPLOYMENTS = RESOURCES[("/apis/apps/v1", "deployments")]
+REPLICASETS = RESOURCES[("/apis/apps/v1", "replicasets")]
+INGRESSES = RESOURCES[("/apis/networking.k8s.io/v1", "ingresses")]
+
+METRICS_PREFIX = "/apis/metrics.k8s.io/v1beta1"
+PATH_RE = re.compile(r"^(?P<prefix>/api/v1|/apis/[^/]+/[^/]+)(?:/namespaces/(?P<namespace>[^/]+))?"
+                     r"/(?P<plural>[^/]+)(?:/(?P<name>[^/]+))?(?:/(?P<sub>[^/]+))?$")
+PARTIAL_METADATA = "as=PartialObjectMetadataList"
+BOOKMARK_INTERVAL_SECONDS = 10
+NODE_IP = "192.168.154.114"
+FAKE_NODES = ("fake-node-1", "fake-node-2", "fake-node-3")
+APP_TYPES = ("nginx", "redis", "postgres", "wordpress", "mysql", "uptime", "custom")
+APP_PORTS = {"nginx": 80, "redis": 6379, "postgres": 5432, "wordpress": 80, "mysql": 3306, "uptime": 3001, "custom": 8080}
+
+
+class ApiError(Exception):
+    def __init__(self, code: int, reason: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+        self.message = message
+
+    def status(self) -> dict:
+        return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Failure",
+                "message": self.message, "reason": self.reason, "code": self.code}
+
+
+def now_rfc3339(offset_seconds: float = 0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def merge_patch(target, patch):
+    """RFC 7386 JSON merge patch (strategic merge patches are approximated with it)"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def json_patch(target: dict, operations: list) -> dict:
+    """RFC 6902 add/replace/remove (enough for the client's list-bodied patches)"""
+    result = copy.deepcopy(target)
+    for op in operations:
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in op["path"].lstrip("/").split("/")]
+        parent = result
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent.setdefault(part, {})
+        last = parts[-1]
+        if op["op"] in ("add", "replace"):
+            if isinstance(parent, list):
+                index = len(parent) if last == "-" else int(last)
+                if op["op"] == "add":
+                    parent.insert(index, op["value"])
+                else:
+                    parent[index] = op["value"]
+            else:
+                parent[last] = op["value"]
+        elif op["op"] == "remove":
+            if isinstance(parent, list):
+                del parent[int(last)]
+            else:
+                parent.pop(last, None)
+    return result
+
+
+def stable_hash(value, length: int = 10) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:length]
+
+
+def query_flag(query: dict, name: str) -> bool:
+    """Boolean query parameter; the kubernetes client sends Python's True/False, not true/false"""
+    return (query.get(name) or "").lower() in ("true", "1")
+
+
+def encode_token(values: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_token(token: str) -> dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise ApiError(400, "BadRequest", "invalid continue token")
+
+
+class FakeCluster:
+    """Object store, event history and controllers. Stored objects are never mutated in place
+    (every change stores a new dict), so events and list results can share them."""
+
+    def __init__(self, history: int = 10000, log_interval: float = 1.0):
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.objects = {}  # (resource, namespace or "", name) -> object
+        self.resource_version = 1
+        self.events = deque(maxlen=history)  # (resourceVersion, resource, namespace, type, object)
+        self.compacted_rv = 1  # watches/continues from before this resourceVersion get 410
+        self.log_interval = log_interval
+        self._node_ports = iter(range(30100, 32768))
+        self._pod_ips = iter(range(1, 1 << 20))
+
+    # --- store ---
+
+    def _key(self, resource: Resource, namespace: Optional[str], name: str) -> tuple:
+        return resource, namespace or "", name
+
+    def _emit(self, resource: Resource, namespace: str, event_type: str, obj: dict):
+        if len(self.events) == self.events.maxlen:
+            self.compacted_rv = self.events[0][0]
+        self.events.append((self.resource_version, resource, namespace, event_type, obj))
+        self.changed.notify_all()
+
+    def _store(self, resource: Resource, obj: dict, event_type: str) -> dict:
+        self.resource_version += 1
+        obj["metadata"]["resourceVersion"] = str(self.resource_version)
+        namespace = obj["metadata"].get("namespace", "")
+        self.objects[self._key(resource, namespace, obj["metadata"]["name"])] = obj
+        self._emit(resource, namespace, event_type, obj)
+        return obj
+
+    def _remove(self, resource: Resource, namespace: str, name: str) -> dict:
+        obj = self.objects.pop(self._key(resource, namespace, name))
+        self.resource_version += 1
+        deleted = dict(obj, metadata=dict(obj["metadata"], resourceVersion=str(self.resource_version)))
+        self._emit(resource, namespace or "", "DELETED", deleted)
+        return deleted
+
+    def get(self, resource: Resource, namespace: Optional[str], name: str) -> dict:
+        with self.lock:
+            obj = self.objects.get(self._key(resource, namespace, name))
+        if obj is None:
+            raise ApiError(404, "NotFound", f'{resource.plural} "{name}" not found')
+        return obj
+
+    def _select(self, resource: Resource, namespace: Optional[str], requirements: list) -> list:
+        items = [obj for (res, ns, _), obj in self.objects.items()
+                 if res == resource and (not namespace or ns == namespace)
+                 and labels_match(obj["metadata"].get("labels"), requirements)]
+        items.sort(key=lambda o: (o["metadata"].get("namespace", ""), o["metadata"]["name"]))
+        return items
+
+    def list(self, resource: Resource, namespace: Optional[str], label_selector: Optional[str] = None,
+             limit: Optional[int] = None, continue_token: Optional[str] = None) -> tuple:
+        """(items, resourceVersion, next continue token)"""
+        requirements = parse_label_selector(label_selector)
+        with self.lock:
+            items = self._select(resource, namespace, requirements)
+            rv = self.resource_version
+            if continue_token:
+                token = decode_token(continue_token)
+                if token["rv"] < self.compacted_rv:
+                    raise ApiError(410, "Expired", "The provided continue parameter is too old")
+                start = tuple(token["start"])
+                items = [o for o in items if (o["metadata"].get("namespace", ""), o["metadata"]["name"]) > start]
+        next_token = None
+        if limit and len(items) > limit:
+            items = items[:limit]
+            last = items[-1]["metadata"]
+            next_token = encode_token({"rv": rv, "start": [last.get("namespace", ""), last["name"]]})
+        return items, rv, next_token
+
+    def create(self, resource: Resource, namespace: Optional[str], body: dict) -> dict:
+        obj = copy.deepcopy(body)
+        obj["apiVersion"], obj["kind"] = resource.api_version, resource.kind
+        meta = obj.setdefault("metadata", {})
+        if not meta.get("name"):
+            if not meta.get("generateName"):
+                raise ApiError(422, "Invalid", "metadata.name: Required value")
+            meta["name"] = meta["generateName"] + uuid.uuid4().hex[:5]
+        if resource.namespaced:
+            meta["namespace"] = namespace
+        with self.lock:
+            if resource.namespaced and self._key(NAMESPACES, None, namespace) not in self.objects:
+                raise ApiError(404, "NotFound", f'namespaces "{namespace}" not found')
+            if self._key(resource, namespace, meta["name"]) in self.objects:
+                raise ApiError(409, "AlreadyExists", f'{resource.plural} "{meta["name"]}" already exists')
+            meta.update(uid=str(uuid.uuid4()), creationTimestamp=now_rfc3339(), generation=1)
+            self._default(resource, obj)
+            self._store(resource, obj, "ADDED")
+            self._reconcile(resource, obj)
+            return self.objects[self._key(resource, namespace, meta["name"])]
+
+    def replace(self, resource: Resource, namespace: Optional[str], name: str, body: dict) -> dict:
+        with self.lock:
+            current = self.get(resource, namespace, name)
+            given_rv = (body.get("metadata") or {}).get("resourceVersion")
+            if given_rv and given_rv != current["metadata"]["resourceVersion"]:
+                raise ApiError(409, "Conflict", f'Operation cannot be fulfilled on {resource.plural} "{name}": '
+                                                "the object has been modified")
+            return self._update(resource, current, copy.deepcopy(body))
+
+    def patch(self, resource: Resource, namespace: Optional[str], name: str, patch, content_type: str) -> dict:
+        with self.lock:
+            current = self.get(resource, namespace, name)
+            if "json-patch" in content_type:
+                updated = json_patch(current, patch)
+            else:
+                updated = merge_patch(current, patch)
+            return self._update(resource, current, updated)
+
+    def _update(self, resource: Resource, current: dict, obj: dict) -> dict:
+        obj["apiVersion"], obj["kind"] = resource.api_version, resource.kind
+        meta = obj.setdefault("metadata", {})
+        for key in ("name", "namespace", "uid", "creationTimestamp"):
+            if key in current["metadata"]:
+                meta[key] = current["metadata"][key]
+        meta["generation"] = current["metadata"].get("generation", 1) + (obj.get("spec") != current.get("spec"))
+        if "status" not in obj and "status" in current:
+            obj["status"] = current["status"]
+        self._default(resource, obj)
+        self._store(resource, obj, "MODIFIED")
+        self._reconcile(resource, obj)
+        return self.objects[self._key(resource, meta.get("namespace"), meta["name"])]
+
+    def delete(self, resource: Resource, namespace: Optional[str], name: str) -> dict:
+        with self.lock:
+            obj = self.get(resource, namespace, name)
+            self._delete_cascading(resource, obj)
+            return obj
+
+    def delete_collection(self, resource: Resource, namespace: Optional[str], label_selector: Optional[str]) -> int:
+        with self.lock:
+            items = self._select(resource, namespace, parse_label_selector(label_selector))
+            for obj in items:
+                self._delete_cascading(resource, obj)
+            return len(items)
+
+    def _delete_cascading(self, resource: Resource, obj: dict):
+        meta = obj["metadata"]
+        namespace = meta.get("namespace", "")
+        if self._key(resource, namespace, meta["name"]) not in self.objects:
+            return
+        self._remove(resource, namespace, meta["name"])
+        if resource == NAMESPACES:
+            for (res, ns, name), child in list(self.objects.items()):
+                if ns == meta["name"]:
+                    self._remove(res, ns, name)
+            return
+        # Garbage collection along owner references
+        for (res, ns, name), child in list(self.objects.items()):
+            if ns == namespace and any(ref.get("uid") == meta["uid"] for ref in child["metadata"].get("ownerReferences") or ()):
+                self._delete_cascading(res, child)
+        if resource == PODS:
+            # A ReplicaSet replaces its deleted pods
+            for ref in meta.get("ownerReferences") or ():
+                owner = self.objects.get(self._key(REPLICASETS, namespace, ref["name"]))
+                if ref.get("kind") == "ReplicaSet" and owner is not None:
+                    self._reconcile_replicaset(owner)
+
+    # --- defaults and controllers ---
+
+    def _default(self, resource: Resource, obj: dict):
+        spec = obj.get("spec") or {}
+        if resource == NAMESPACES:
+            obj["status"] = {"phase": "Active"}
+        elif resource == SERVICES:
+            spec.setdefault("clusterIP", f"10.96.{random.randint(0, 255)}.{random.randint(1, 254)}")
+            spec.setdefault("type", "ClusterIP")
+            for port in spec.get("ports") or ():
+                port.setdefault("protocol", "TCP")
+                port.setdefault("targetPort", port.get("port"))
+                if spec["type"] == "NodePort" and not port.get("nodePort"):
+                    port["nodePort"] = next(self._node_ports)
+            obj["spec"] = spec
+        elif resource.plural == "persistentvolumeclaims":
+            obj["status"] = {"phase": "Bound", "capacity": (spec.get("resources") or {}).get("requests", {})}
+        elif resource.plural == "jobs" and not obj.get("status"):
+            obj["status"] = {"succeeded": 1, "startTime": obj["metadata"]["creationTimestamp"],
+                             "completionTime": now_rfc3339()}
+        elif resource.plural == "horizontalpodautoscalers":
+            replicas = spec.get("minReplicas") or 1
+            obj["status"] = {"currentReplicas": replicas, "desiredReplicas": replicas,
+                             "currentCPUUtilizationPercentage": 20}
+
+    def _reconcile(self, resource: Resource, obj: dict):
+        if resource == DEPLOYMENTS:
+            self._reconcile_deployment(obj)
+
+    def _owner_ref(self, owner: dict) -> dict:
+        return {"apiVersion": owner["apiVersion"], "kind": owner["kind"], "name": owner["metadata"]["name"],
+                "uid": owner["metadata"]["uid"], "controller": True, "blockOwnerDeletion": True}
+
+    def _owned_by(self, resource: Resource, owner: dict) -> list:
+        namespace = owner["metadata"].get("namespace", "")
+        return [obj for (res, ns, _), obj in self.objects.items()
+                if res == resource and ns == namespace
+                and any(ref.get("uid") == owner["metadata"]["uid"] for ref in obj["metadata"].get("ownerReferences") or ())]
+
+    def _reconcile_deployment(self, deployment: dict):
+        namespace = deployment["metadata"]["namespace"]
+        spec = deployment.get("spec") or {}
+        template = spec.get("template") or {}
+        template_hash = stable_hash(template)
+        rs_name = f"{deployment['metadata']['name']}-{template_hash}"
+        replicas = spec.get("replicas", 1)
+
+        # Rolling update, instantly: the old ReplicaSets and their pods go away
+        for old in self._owned_by(REPLICASETS, deployment):
+            if old["metadata"]["name"] != rs_name:
+                self._delete_cascading(REPLICASETS, old)
+
+        replicaset = self.objects.get(self._key(REPLICASETS, namespace, rs_name))
+        match_labels = dict((spec.get("selector") or {}).get("matchLabels") or {}, **{"pod-template-hash": template_hash})
+        template_meta = template.get("metadata") or {}
+        rs = {
+            "apiVersion": "apps/v1", "kind": "ReplicaSet",
+            "metadata": {
+                "name": rs_name, "namespace": namespace,
+                "labels": dict(template_meta.get("labels") or {}, **{"pod-template-hash": template_hash}),
+                "ownerReferences": [self._owner_ref(deployment)],
+            },
+            "spec": {
+                "replicas": replicas,
+                "selector": {"matchLabels": match_labels},
+                "template": dict(template, metadata=dict(template_meta, labels=dict(
+                    template_meta.get("labels") or {}, **{"pod-template-hash": template_hash}))),
+            },
+        }
+        if replicaset is None:
+            rs["metadata"].update(uid=str(uuid.uuid4()), creationTimestamp=now_rfc3339(), generation=1)
+            replicaset = self._store(REPLICASETS, rs, "ADDED")
+        elif replicaset["spec"].get("replicas") != replicas:
+            replicaset = self._store(REPLICASETS, dict(replicaset, spec=dict(replicaset["spec"], replicas=replicas),
+                                                       metadata=dict(replicaset["metadata"])), "MODIFIED")
+        ready = self._reconcile_replicaset(replicaset)
+
+        status = {"observedGeneration": deployment["metadata"].get("generation", 1), "replicas": ready,
+                  "readyReplicas": ready, "availableReplicas": ready, "updatedReplicas": ready}
+        if deployment.get("status") != status:
+            self._store(DEPLOYMENTS, dict(deployment, status=status, metadata=dict(deployment["metadata"])), "MODIFIED")
+
+    def _reconcile_replicaset(self, replicaset: dict) -> int:
+        namespace = replicaset["metadata"]["namespace"]
+        replicas = replicaset["spec"].get("replicas", 1)
+        pods = self._owned_by(PODS, replicaset)
+        for extra in pods[replicas:]:
+            self._delete_cascading(PODS, extra)
+        for _ in range(replicas - len(pods)):
+            self._store(PODS, self._new_pod(replicaset), "ADDED")
+        status = {"replicas": replicas, "readyReplicas": replicas, "availableReplicas": replicas,
+                  "observedGeneration": replicaset["metadata"].get("generation", 1)}
+        if replicaset.get("status") != status:
+            self._store(REPLICASETS, dict(replicaset, status=status, metadata=dict(replicaset["metadata"])), "MODIFIED")
+        return replicas
+
+    def _new_pod(self, replicaset: dict) -> dict:
+        template = replicaset["spec"]["template"]
+        spec = copy.deepcopy(template.get("spec") or {})
+        ip = next(self._pod_ips)
+        spec["nodeName"] = random.choice(FAKE_NODES)
+        started = now_rfc3339()
+        return {
+            "apiVersion": "v1", "kind": "Pod",
+            "metadata": {
+                "name": f"{replicaset['metadata']['name']}-{uuid.uuid4().hex[:5]}",
+                "namespace": replicaset["metadata"]["namespace"],
+                "labels": dict((template.get("metadata") or {}).get("labels") or {}),
+                "ownerReferences": [self._owner_ref(replicaset)],
+                "uid": str(uuid.uuid4()), "creationTimestamp": started,
+            },
+            "spec": spec,
+            "status": {
+                "phase": "Running", "hostIP": NODE_IP, "podIP": f"10.244.{ip >> 8 & 255}.{ip & 255}",
+                "startTime": started,
+                "conditions": [{"type": "Ready", "status": "True"}],
+                "containerStatuses": [
+                    {"name": c.get("name", "app"), "image": c.get("image", ""), "imageID": f"fake://{c.get('image', '')}",
+                     "ready": True, "started": True, "restartCount": 0, "state": {"running": {"startedAt": started}}}
+                    for c in spec.get("containers") or ()
+                ],
+            },
+        }
+
+    # --- watch ---
+
+    def watch(self, resource: Resource, namespace: Optional[str], label_selector: Optional[str],
+              resource_version: Optional[str], timeout: float, bookmarks: bool, write):
+        """Stream events to write(event) until the timeout, or until write raises (client gone)"""
+        requirements = parse_label_selector(label_selector)
+        deadline = time.monotonic() + timeout
+
+        def wanted(res, ns, obj):
+            return res == resource and (not namespace or ns == namespace) and \
+                labels_match(obj["metadata"].get("labels"), requirements)
+
+        with self.lock:
+            if resource_version in (None, "", "0"):
+                pending = [{"type": "ADDED", "object": obj} for obj in self._select(resource, namespace, requirements)]
+                since = self.resource_version
+            else:
+                since = int(resource_version)
+                pending = []
+        last_bookmark = time.monotonic()
+        while True:
+            for event in pending:
+                write(event)
+            pending = []
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            with self.lock:
+                if since < self.compacted_rv:
+                    write({"type": "ERROR", "object": ApiError(
+                        410, "Expired", f"too old resource version: {since} ({self.compacted_rv})").status()})
+                    return
+                if self.resource_version <= since:
+                    self.changed.wait(min(remaining, 1.0))
+                events = []
+                for event in reversed(self.events):
+                    if event[0] <= since:
+                        break
+                    events.append(event)
+                for rv, res, ns, event_type, obj in reversed(events):
+                    if wanted(res, ns, obj):
+                        pending.append({"type": event_type, "object": obj})
+                since = max(since, self.resource_version)
+            if bookmarks and time.monotonic() - last_bookmark >= BOOKMARK_INTERVAL_SECONDS:
+                pending.append({"type": "BOOKMARK", "object": {
+                    "kind": resource.kind, "apiVersion": resource.api_version,
+                    "metadata": {"resourceVersion": str(since)}}})
+                last_bookmark = time.monotonic()
+
+    # --- pod logs and metrics ---
+
+    def log_lines(self, pod: dict, container: Optional[str], timestamps: bool, since_seconds: Optional[int],
+                  tail_lines: Optional[int], after: Optional[int] = None) -> tuple:
+        """Deterministic log lines of a pod: one per log_interval since it started.
+        Returns (lines, index of the last line)."""
+        started = datetime.strptime(pod["status"]["startTime"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        name = pod["metadata"]["name"]
+        container = container or ((pod["spec"].get("containers") or [{}])[0].get("name", "app"))
+        last = int((datetime.now(timezone.utc) - started).total_seconds() / self.log_interval)
+        first = 0 if after is None else after + 1
+        if since_seconds:
+            first = max(first, last - int(since_seconds / self.log_interval))
+        if tail_lines is not None and after is None:
+            first = max(first, last - tail_lines + 1)
+        first = max(first, last - 9999)  # the "kubelet" keeps the last 10k lines
+        lines = []
+        for i in range(first, last + 1):
+            at = started + timedelta(seconds=i * self.log_interval)
+            text = f"{name} [{container}] GET /api/items/{i % 97} 200 {(i * 7919) % 250}ms"
+            lines.append(f"{at.strftime('%Y-%m-%dT%H:%M:%S.%f')}000Z {text}" if timestamps else text)
+        return lines, last
+
+    def pod_metrics(self, namespace: Optional[str], name: Optional[str] = None) -> list:
+        with self.lock:
+            pods = [self.get(PODS, namespace, name)] if name else self._select(PODS, namespace, [])
+        t = time.time()
+        items = []
+        for pod in pods:
+            if pod.get("status", {}).get("phase") != "Running":
+                continue
+            seed = int(stable_hash(pod["metadata"]["name"], 8), 16)
+            wave = 1 + 0.3 * math.sin(t / 60 + seed % 10)
+            items.append({
+                "metadata": {"name": pod["metadata"]["name"], "namespace": pod["metadata"]["namespace"],
+                             "creationTimestamp": now_rfc3339(), "labels": pod["metadata"].get("labels")},
+                "timestamp": now_rfc3339(), "window": "30s",
+                "containers": [{"name": c.get("name", "app"), "usage": {
+                    "cpu": f"{int((seed % 200 + 5) * 1_000_000 * wave)}n",
+                    "memory": f"{(seed % 256 + 32) * 1024 + int(wave * 512)}Ki",
+                }} for c in pod["spec"].get("containers") or ()],
+            })
+        return items
+
+    def node_metrics(self) -> list:
+        return [{"metadata": {"name": node}, "timestamp": now_rfc3339(), "window": "30s",
+                 "usage": {"cpu": f"{random.randint(200, 2000)}m", "memory": f"{random.randint(2, 12)}Gi"}}
+                for node in FAKE_NODES]
+
+    # --- seeding ---
+
+    def seed_base(self):
+        """Nodes and the admin-platform namespace with the regcred secret the backend copies"""
+        for node in FAKE_NODES:
+            if self._key(NODES, None, node) not in self.objects:
+                self.create(NODES, None, {"metadata": {"name": node}, "status": {
+                    "addresses": [{"type": "InternalIP", "address": NODE_IP}],
+                    "capacity": {"cpu": "8", "memory": "32Gi"}, "allocatable": {"cpu": "8", "memory": "32Gi"}}})
+        self.ensure_namespace("admin-platform")
+        if self._key(SECRETS, "admin-platform", "regcred") not in self.objects:
+            self.create(SECRETS, "admin-platform", {
+                "metadata": {"name": "regcred"}, "type": "kubernetes.io/dockerconfigjson",
+                "data": {".dockerconfigjson": base64.b64encode(b'{"auths":{}}').decode()}})
+
+    def ensure_namespace(self, namespace: str):
+        if self._key(NAMESPACES, None, namespace) not in self.objects:
+            self.create(NAMESPACES, None, {"metadata": {"name": namespace}})
+
+    def seed_tenant(self, namespace: str, owner: str, deployments: int, replicas: int = 1):
+        """Deployments shaped like the backend's create_pod: Deployment + NodePort Service (+ Ingress)"""
+        self.ensure_namespace(namespace)
+        for i in range(deployments):
+            app_type = APP_TYPES[i % len(APP_TYPES)]
+            name = f"{app_type}-{1000 + i}"
+            labels = {"app": name, "owner": owner}
+            port = APP_PORTS[app_type]
+            self.create(DEPLOYMENTS, namespace, {
+                "metadata": {"name": name, "labels": labels},
+                "spec": {"replicas": replicas, "selector": {"matchLabels": labels}, "template": {
+                    "metadata": {"labels": labels},
+                    "spec": {"containers": [{"name": name, "image": f"{app_type}:latest",
+                                             "ports": [{"containerPort": port}],
+                                             "resources": {"limits": {"cpu": "500m", "memory": "512Mi"}}}],
+                             "imagePullSecrets": [{"name": "regcred"}]}}},
+            })
+            self.create(SERVICES, namespace, {
+                "metadata": {"name": f"{name}-svc"},
+                "spec": {"type": "NodePort", "selector": {"app": name}, "ports": [{"port": port}]},
+            })
+            if app_type not in ("postgres", "redis", "mysql"):
+                self.create(INGRESSES, namespace, {
+                    "metadata": {"name": f"{name}-svc-ingress"},
+                    "spec": {"rules": [{"host": f"{name}.{namespace}.{NODE_IP}.sslip.io", "http": {"paths": [{
+                        "path": "/", "pathType": "Prefix",
+                        "backend": {"service": {"name": f"{name}-svc", "port": {"number": port}}}}]}}]},
+                })
+
+
+class FaultRule:
+    """Latency and errors for requests matching a method set and a path regex"""
+
+    def __init__(self, pattern: str = ".*", methods: Optional[set] = None, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0.0, error_status: int = 500):
+        self.pattern = re.compile(pattern)
+        self.methods = methods
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    @classmethod
+    def parse(cls, spec: str) -> "FaultRule":
+        """"[METHODS] PATTERN key=value..." e.g. "GET /api/v1/.*/pods latency=200 errors=0.1 status=503" """
+        parts = spec.split()
+        methods = None
+        if parts and re.fullmatch(r"[A-Z,]+", parts[0]):
+            methods = set(parts.pop(0).split(","))
+        pattern = parts.pop(0) if parts and "=" not in parts[0] else ".*"
+        options = dict(part.split("=", 1) for part in parts)
+        return cls(pattern, methods, latency_ms=float(options.get("latency", 0)),
+                   jitter_ms=float(options.get("jitter", 0)), error_rate=float(options.get("errors", 0)),
+                   error_status=int(options.get("status", 500)))
+
+    def apply(self, method: str, path: str) -> Optional[int]:
+        """Sleeps for the injected latency; returns an HTTP status to fail with, or None"""
+        if (self.methods and method not in self.methods) or not self.pattern.search(path):
+            return None
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "fake-apiserver"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # --- responses ---
+
+    def _send_json(self, code: int, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats["requests"] += 1
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _end_stream(self):
+        try:
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+
+    # --- routing ---
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        cluster = self.server.cluster
+        for rule in self.server.faults:
+            status = rule.apply(method, url.path)
+            if status:
+                self.server.stats["injected_errors"] += 1
+                self._send_json(status, ApiError(status, "InternalError" if status >= 500 else "Injected",
+                                                 "injected fault").status())
+                return
+        try:
+            body = json.loads(raw) if raw else None
+            if url.path.startswith(METRICS_PREFIX):
+                self._metrics(url.path[len(METRICS_PREFIX):])
+                return
+            match = PATH_RE.match(url.path)
+            resource = RESOURCES.get((match["prefix"], match["plural"])) if match else None
+            if resource is None:
+                raise ApiError(404, "NotFound", f"the server could not find the requested resource ({url.path})")
+            namespace, name, sub = match["namespace"], match["name"], match["sub"]
+            if resource == PODS and sub == "log":
+                self._pod_log(namespace, name, query)
+                return
+            if sub:
+                raise ApiError(404, "NotFound", f"subresource {sub} is not supported")
+            self._resource(method, resource, namespace, name, query, body)
+        except ApiError as e:
+            self._send_json(e.code, e.status())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            self._send_json(500, ApiError(500, "InternalError", str(e)).status())
+
+    def _resource(self, method: str, resource: Resource, namespace, name, query: dict, body):
+        cluster = self.server.cluster
+        if method == "GET" and name is None:
+            if query_flag(query, "watch"):
+                self._watch(resource, namespace, query)
+                return
+            items, rv, token = cluster.list(resource, namespace, query.get("labelSelector"),
+                                            int(query["limit"]) if query.get("limit") else None, query.get("continue"))
+            if PARTIAL_METADATA in (self.headers.get("Accept") or ""):
+                kind, api_version = "PartialObjectMetadataList", "meta.k8s.io/v1"
+                items = [{"kind": "PartialObjectMetadata", "apiVersion": api_version, "metadata": o["metadata"]}
+                         for o in items]
+            else:
+                kind, api_version = f"{resource.kind}List", resource.api_version
+            metadata = {"resourceVersion": str(rv)}
+            if token:
+                metadata["continue"] = token
+            self._send_json(200, {"kind": kind, "apiVersion": api_version, "metadata": metadata, "items": items})
+        elif method == "GET":
+            self._send_json(200, cluster.get(resource, namespace, name))
+        elif method == "POST":
+            self._send_json(201, cluster.create(resource, namespace, body or {}))
+        elif method == "PUT":
+            self._send_json(200, cluster.replace(resource, namespace, name, body or {}))
+        elif method == "PATCH":
+            self._send_json(200, cluster.patch(resource, namespace, name, body, self.headers.get("Content-Type", "")))
+        elif method == "DELETE" and name is None:
+            count = cluster.delete_collection(resource, namespace, query.get("labelSelector"))
+            self._send_json(200, {"kind": "Status", "apiVersion": "v1", "status": "Success", "details": {"count": count}})
+        elif method == "DELETE":
+            obj = cluster.delete(resource, namespace, name)
+            self._send_json(200, {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Success",
+                                  "details": {"name": name, "kind": resource.plural, "uid": obj["metadata"]["uid"]}})
+        else:
+            raise ApiError(405, "MethodNotAllowed", f"{method} is not supported here")
+
+    def _watch(self, resource: Resource, namespace, query: dict):
+        self.server.stats["watches"] += 1
+        self._start_stream("application/json")
+        try:
+            self.server.cluster.watch(
+                resource, namespace, query.get("labelSelector"), query.get("resourceVersion"),
+                float(query.get("timeoutSeconds") or 1800), query_flag(query, "allowWatchBookmarks"),
+                lambda event: self._write_chunk(json.dumps(event, separators=(",", ":")).encode() + b"\n"),
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self._end_stream()
+
+    def _pod_log(self, namespace: str, name: str, query: dict):
+        cluster = self.server.cluster
+        pod = cluster.get(PODS, namespace, name)
+        options = dict(container=query.get("container"), timestamps=query_flag(query, "timestamps"),
+                       since_seconds=int(query["sinceSeconds"]) if query.get("sinceSeconds") else None)
+        lines, last = cluster.log_lines(pod, tail_lines=int(query["tailLines"]) if query.get("tailLines") else None,
+                                        **options)
+        text = "".join(line + "\n" for line in lines).encode()
+        if query.get("limitBytes"):
+            text = text[:int(query["limitBytes"])]
+        if not query_flag(query, "follow"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(text)))
+            self.end_headers()
+            self.wfile.write(text)
+            return
+        self._start_stream("text/plain")
+        try:
+            if text:
+                self._write_chunk(text)
+            deadline = time.monotonic() + 3600
+            while time.monotonic() < deadline:
+                time.sleep(cluster.log_interval)
+                cluster.get(PODS, namespace, name)  # stops (404 -> end of stream) once the pod is gone
+                lines, last = cluster.log_lines(pod, tail_lines=None, after=last, **options)
+                if lines:
+                    self._write_chunk("".join(line + "\n" for line in lines).encode())
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except ApiError:
+            pass
+        self._end_stream()
+
+    def _metrics(self, path: str):
+        cluster = self.server.cluster
+        match = re.match(r"^(?:/namespaces/(?P<namespace>[^/]+))?/(?P<plural>pods|nodes)(?:/(?P<name>[^/]+))?$", path)
+        if not match:
+            raise ApiError(404, "NotFound", f"the server could not find the requested resource ({path})")
+        api_version = "metrics.k8s.io/v1beta1"
+        if match["plural"] == "nodes":
+            items = cluster.node_metrics()
+            kind = "NodeMetrics"
+        else:
+            items = cluster.pod_metrics(match["namespace"], match["name"])
+            kind = "PodMetrics"
+        if match["name"]:
+            if not items:
+                raise ApiError(404, "NotFound", f'{match["plural"]}.metrics.k8s.io "{match["name"]}" not found')
+            self._send_json(200, dict(items[0], kind=kind, apiVersion=api_version))
+        else:
+            self._send_json(200, {"kind": f"{kind}List", "apiVersion": api_version, "metadata": {}, "items": items})
+
+
+class FakeApiServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, faults: tuple = (), history: int = 10000,
+                 log_interval: float = 1.0, verbose: bool = False):
+        self.cluster = FakeCluster(history=history, log_interval=log_interval)
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.cluster = self.cluster
+        self.httpd.faults = list(faults)
+        self.httpd.verbose = verbose
+        self.httpd.stats = {"requests": 0, "watches": 0, "injected_errors": 0}
+        self._thread: Optional[threading.Thread] = None
+        self.cluster.seed_base()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict:
+        return dict(self.httpd.stats, resource_version=self.cluster.resource_version,
+                    objects=len(self.cluster.objects))
+
+    def start(self) -> "FakeApiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-apiserver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def write_kubeconfig(self, path: str):
+        """A kubeconfig (JSON is valid YAML) that points the kubernetes client at this server"""
+        kubeconfig = {
+            "apiVersion": "v1", "kind": "Config", "current-context": "fake",
+            "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+            "users": [{"name": "fake", "user": {"token": "fake-token"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+        }
+        with open(path, "w") as f:
+            json.dump(kubeconfig, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--kubeconfig", help="write a kubeconfig for this server to this path")
+    parser.add_argument("--tenants", type=int, default=0, help="seed org-tenant-<n> namespaces")
+    parser.add_argument("--deployments", type=int, default=5, help="deployments per seeded tenant")
+    parser.add_argument("--replicas", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests failing with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rule", action="append", default=[], help='"[METHODS] PATTERN latency=MS jitter=MS errors=RATE status=CODE"')
+    parser.add_argument("--history", type=int, default=10000, help="watch events kept before 410 Expired")
+    parser.add_argument("--log-interval", type=float, default=1.0, help="seconds between fake log lines of a pod")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    faults = [FaultRule(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        error_status=args.error_status)] + [FaultRule.parse(rule) for rule in args.rule]
+    server = FakeApiServer(args.host, args.port, faults, history=args.history, log_interval=args.log_interval,
+                           verbose=args.verbose)
+    for n in range(args.tenants):
+        server.cluster.seed_tenant(f"org-tenant-{n}", f"tenant-{n}", args.deployments, args.replicas)
+    if args.kubeconfig:
+        server.write_kubeconfig(args.kubeconfig)
+    print(f"fake API server on {server.url} ({server.stats['objects']} objects)"
+          + (f", kubeconfig {args.kubeconfig}" if args.kubeconfig else ""))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+Load test of the hot endpoints at tenant scale, with a regression check against a baseline.
+
+    cd backend
+    python -m benchmarks.load --tenants 50 --deployments 10 --replicas 2 --output /tmp/load.json
+    python -m benchmarks.load --tenants 50 --deployments 10 --replicas 2 --baseline /tmp/load.json
+
+By default everything runs locally: benchmarks.fake_apiserver (a subprocess, seeded with
+--tenants namespaces of --deployments deployments) and the backend (uvicorn, a subprocess with
+a fresh SQLite database in a temp dir) pointed at it through a kubeconfig. With --kubeconfig
+the backend talks to that cluster instead (kind, k3d, ...) and the deployments are created
+through POST /pods. Tenants are registered through /register as tenant-<n> / company tenant-<n>.
+
+Each endpoint is then driven on its own by --concurrency clients (threads with keep-alive
+connections) for --requests requests, after --warmup discarded ones:
+
+    POST /token                  login of a random tenant (Argon2 bound)
+    GET  /pods                   the tenant's pods
+    GET  /monitoring             the tenant's monitoring overview
+    GET  /pods/{pod_name}/metrics usage of a random pod of the tenant
+    GET  /admin/stats            platform totals (admin)
+    GET  /admin/companies        company listing, first page (admin)
+
+Reported per endpoint: p50/p95/p99/mean latency, throughput, errors, response bytes and the
+Kubernetes API calls per request (the backend's X-K8s-Calls header); for the backend process
+the peak RSS (Linux, VmHWM). Latency is measured by the Python clients, so compare runs made on
+the same machine with the same --concurrency.
+
+--output writes the results as JSON. --baseline compares against an earlier --output file and
+exits with status 1 when an endpoint regressed: p95/p99 or peak RSS up, or throughput down, by
+more than --tolerance; or more Kubernetes calls per request (see --calls-tolerance).
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TENANT_PASSWORD = "bench-password"
+ADMIN_USERNAME, ADMIN_PASSWORD = "admin", "admin123"  # create_default_admin
+SERVICE_TYPES = ("nginx", "redis", "postgres", "wordpress", "mysql", "uptime")
+
+ENDPOINTS = ("token", "pods", "monitoring", "pod_metrics", "admin_stats", "admin_companies")
+ROUTES = {
+    "token": "POST /token",
+    "pods": "GET /pods",
+    "monitoring": "GET /monitoring",
+    "pod_metrics": "GET /pods/{pod_name}/metrics",
+    "admin_stats": "GET /admin/stats",
+    "admin_companies": "GET /admin/companies",
+}
+
+
+class Tenant:
+    def __init__(self, username: str):
+        self.username = username
+        self.token: Optional[str] = None
+        self.pods: list = []
+
+
+class Client:
+    """One keep-alive connection to the backend"""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        url = urlparse(base_url)
+        self.host, self.port, self.timeout = url.hostname, url.port or 80, timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[dict] = None) -> tuple:
+        """(status, headers, body); reconnects once when the server closed the connection"""
+        try:
+            return self._send(method, path, body, headers)
+        except (ConnectionError, http.client.HTTPException):
+            self.close()
+            return self._send(method, path, body, headers)
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Optional[dict]) -> tuple:
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            return response.status, response.headers, response.read()
+        except OSError:
+            self.close()
+            raise
+
+    def json(self, method: str, path: str, payload=None, token: Optional[str] = None, form: Optional[dict] = None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        body = None
+        if form is not None:
+            body = urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        status, _, data = self.request(method, path, body, headers)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path}: {status} {data[:200]!r}")
+        return json.loads(data) if data else None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout: float, what: str, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{what} exited with status {process.returncode}")
+        try:
+            if check():
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{what} not ready after {timeout:.0f}s")
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+# --- environment ---
+
+def start_fake_apiserver(args, workdir: str) -> tuple:
+    kubeconfig = os.path.join(workdir, "kubeconfig")
+    command = [sys.executable, "-m", "benchmarks.fake_apiserver", "--port", str(free_port()),
+               "--kubeconfig", kubeconfig, "--tenants", str(args.tenants), "--deployments", str(args.deployments),
+               "--replicas", str(args.replicas), "--latency-ms", str(args.apiserver_latency_ms),
+               "--jitter-ms", str(args.apiserver_jitter_ms)]
+    for rule in args.apiserver_rule:
+        command += ["--rule", rule]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+    wait_until(lambda: os.path.exists(kubeconfig), args.startup_timeout, "fake API server", process)
+    return process, kubeconfig
+
+
+def start_backend(args, workdir: str, kubeconfig: str) -> tuple:
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "KUBECONFIG": kubeconfig,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'users.db')}",
+        "LOG_ARCHIVE_DIR": os.path.join(workdir, "logs"),
+        "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+    })
+    for setting in args.backend_env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+    log = open(os.path.join(workdir, "backend.log"), "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    health = Client(url, timeout=2)
+    wait_until(lambda: health.request("GET", "/health")[0] == 200, args.startup_timeout, "backend", process)
+    health.close()
+    return process, url
+
+
+def seed(args, url: str, create_deployments: bool) -> tuple:
+    """Register the tenants (and create their deployments through the API on a real cluster),
+    log everyone in and collect the pod names; returns (tenants, admin token)"""
+    client = Client(url)
+    tenants = [Tenant(f"tenant-{n}") for n in range(args.tenants)]
+    for tenant in tenants:
+        client.json("POST", "/register", {"username": tenant.username, "password": TENANT_PASSWORD,
+                                          "company_name": tenant.username})
+        tenant.token = client.json("POST", "/token", form={"username": tenant.username,
+                                                           "password": TENANT_PASSWORD})["access_token"]
+        if create_deployments:
+            for i in range(args.deployments):
+                client.json("POST", "/pods", {"service_type": SERVICE_TYPES[i % len(SERVICE_TYPES)]}, token=tenant.token)
+    admin_token = client.json("POST", "/token", form={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})["access_token"]
+
+    # The backend's cluster cache needs a moment to list everything the seeding created
+    expected = args.deployments * args.replicas
+    deadline = time.monotonic() + args.startup_timeout
+    for tenant in tenants:
+        while True:
+            tenant.pods = [pod["name"] for pod in client.json("GET", "/pods?fields=name", token=tenant.token)]
+            if len(tenant.pods) >= expected or time.monotonic() > deadline:
+                break
+            time.sleep(0.5)
+    client.close()
+    return tenants, admin_token
+
+
+# --- load ---
+
+def make_request(endpoint: str, tenants: list, admin_token: str) -> tuple:
+    """(method, path, body, headers) of one request to an endpoint"""
+    tenant = random.choice(tenants)
+    auth = {"Authorization": f"Bearer {tenant.token}"}
+    if endpoint == "token":
+        body = urlencode({"username": tenant.username, "password": TENANT_PASSWORD}).encode()
+        return "POST", "/token", body, {"Content-Type": "application/x-www-form-urlencoded"}
+    if endpoint == "pods":
+        return "GET", "/pods", None, auth
+    if endpoint == "monitoring":
+        return "GET", "/monitoring", None, auth
+    if endpoint == "pod_metrics":
+        pod = random.choice(tenant.pods) if tenant.pods else "missing"
+        return "GET", f"/pods/{pod}/metrics", None, auth
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    if endpoint == "admin_stats":
+        return "GET", "/admin/stats", None, admin
+    if endpoint == "admin_companies":
+        return "GET", "/admin/companies", None, admin
+    raise ValueError(endpoint)
+
+
+def drive(url: str, endpoint: str, tenants: list, admin_token: str, requests: int, concurrency: int,
+          accept_encoding: str) -> dict:
+    samples = []  # (seconds, status, k8s calls or None, bytes)
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def worker():
+        client = Client(url)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                method, path, body, headers = make_request(endpoint, tenants, admin_token)
+                if accept_encoding:
+                    headers = dict(headers, **{"Accept-Encoding": accept_encoding})
+                started = time.perf_counter()
+                try:
+                    status, response_headers, data = client.request(method, path, body, headers)
+                except (OSError, http.client.HTTPException):
+                    status, response_headers, data = 0, {}, b""
+                elapsed = time.perf_counter() - started
+                calls = response_headers.get("X-K8s-Calls") if response_headers else None
+                with lock:
+                    samples.append((elapsed, status, int(calls) if calls is not None else None, len(data)))
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    calls = [s[2] for s in samples if s[2] is not None]
+    errors = sum(1 for s in samples if not 200 <= s[1] < 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "statuses": {str(code): sum(1 for s in samples if s[1] == code) for code in sorted({s[1] for s in samples})},
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "k8s_calls_mean": round(statistics.fmean(calls), 2) if calls else None,
+        "k8s_calls_max": max(calls) if calls else None,
+        "response_bytes_mean": round(statistics.fmean(s[3] for s in samples)) if samples else 0,
+    }
+
+
+# --- baseline comparison ---
+
+def compare(results: dict, baseline: dict, tolerance: float, calls_tolerance: float) -> list:
+    """Regressions of results against baseline, as human-readable lines"""
+    regressions = []
+
+    def worse(label: str, current, previous, higher_is_worse: bool = True, slack: Optional[float] = None):
+        if current is None or previous is None:
+            return
+        if slack is not None:
+            regressed = current > previous + slack
+        elif higher_is_worse:
+            regressed = current > previous * (1 + tolerance)
+        else:
+            regressed = current < previous * (1 - tolerance)
+        if regressed:
+            regressions.append(f"{label}: {previous} -> {current}")
+
+    for endpoint, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if previous is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            worse(f"{endpoint} {metric}", current[metric], previous[metric])
+        worse(f"{endpoint} throughput_rps", current["throughput_rps"], previous["throughput_rps"], higher_is_worse=False)
+        worse(f"{endpoint} error_rate", current["error_rate"], previous["error_rate"], slack=0.01)
+        worse(f"{endpoint} k8s_calls_mean", current["k8s_calls_mean"], previous["k8s_calls_mean"], slack=calls_tolerance)
+    worse("backend peak_rss_mb", results["backend"]["peak_rss_mb"], baseline.get("backend", {}).get("peak_rss_mb"))
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{results['config']['tenants']} tenants x {results['config']['deployments']} deployments "
+          f"x {results['config']['replicas']} replicas, {results['config']['concurrency']} clients")
+    print(f"{'endpoint':30} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>6} {'k8s/req':>8} {'bytes':>9}")
+    for endpoint, r in results["endpoints"].items():
+        calls = "-" if r["k8s_calls_mean"] is None else f"{r['k8s_calls_mean']:.1f}"
+        print(f"{endpoint:30} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['errors']:>6} {calls:>8} {r['response_bytes_mean']:>9}")
+    rss = results["backend"]["peak_rss_mb"]
+    print(f"backend peak RSS: {'n/a' if rss is None else f'{rss:.0f} MB'}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--deployments", type=int, default=5, help="deployments per tenant")
+    parser.add_argument("--replicas", type=int, default=1, help="pods per deployment (fake API server only)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="discarded requests per endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--accept-encoding", default="gzip", help='sent by the clients ("" for none)')
+    parser.add_argument("--kubeconfig", help="use this cluster instead of the fake API server")
+    parser.add_argument("--apiserver-latency-ms", type=float, default=0, help="fake API server latency per call")
+    parser.add_argument("--apiserver-jitter-ms", type=float, default=0)
+    parser.add_argument("--apiserver-rule", action="append", default=[], help="fault rule, see benchmarks.fake_apiserver")
+    parser.add_argument("--backend-env", action="append", default=[], help="KEY=VALUE for the backend, e.g. CLUSTER_CACHE_ENABLED=false")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change of latency, throughput, RSS")
+    parser.add_argument("--calls-tolerance", type=float, default=0.0, help="allowed increase of k8s calls per request")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the database, kubeconfig and backend log")
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    processes = []
+    try:
+        if args.kubeconfig:
+            kubeconfig = args.kubeconfig
+        else:
+            fake, kubeconfig = start_fake_apiserver(args, workdir)
+            processes.append(fake)
+        backend, url = start_backend(args, workdir, kubeconfig)
+        processes.append(backend)
+        tenants, admin_token = seed(args, url, create_deployments=bool(args.kubeconfig))
+
+        results = {
+            "config": {key: getattr(args, key) for key in (
+                "tenants", "deployments", "replicas", "concurrency", "requests", "warmup", "accept_encoding",
+                "apiserver_latency_ms", "apiserver_jitter_ms", "apiserver_rule", "backend_env")},
+            "environment": {"cluster": "kubeconfig" if args.kubeconfig else "fake", "commit": git_commit(),
+                            "python": platform.python_version(), "platform": platform.platform(),
+                            "cpus": os.cpu_count(), "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+            "endpoints": {},
+        }
+        for endpoint in endpoints:
+            if args.warmup:
+                drive(url, endpoint, tenants, admin_token, args.warmup, args.concurrency, args.accept_encoding)
+            results["endpoints"][ROUTES[endpoint]] = drive(
+                url, endpoint, tenants, admin_token, args.requests, args.concurrency, args.accept_encoding)
+        results["backend"] = {"peak_rss_mb": peak_rss_mb(backend.pid)}
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep_workdir:
+            print(f"work dir: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.calls_tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Serialization cost of a /pods response, before and after the orjson path, plus compression.
+
+    cd backend
+    python -m benchmarks.serialization --pods 500
+
+before  PodInfo(...) validated when built, validated again against response_model, then
+        jsonable_encoder + json.dumps (FastAPI's default JSONResponse path)
+after   construct(PodInfo, ...) without validation, rendered by fast_json.dumps (orjson)
+
+The compressed sizes and times are those of CompressionMiddleware's settings (gzip level 6,
+brotli quality 4; brotli is skipped when the package is not installed).
+"""
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import time
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from compression import brotli
+from fast_json import construct, dumps, to_dict
+
+
+class PodInfo(BaseModel):
+    # Same fields as main.PodInfo
+    name: str
+    status: str
+    cost: float
+    type: str
+    age: str
+    image: Optional[str] = None
+    restarts: Optional[int] = 0
+    message: Optional[str] = None
+    pod_ip: Optional[str] = None
+    node_name: Optional[str] = None
+    external_url: Optional[str] = None
+    public_ip: Optional[str] = None
+    node_port: Optional[int] = None
+    group_id: Optional[str] = None
+    cpu_usage: Optional[str] = None
+    memory_usage: Optional[str] = None
+    cpu_limit: Optional[str] = None
+    memory_limit: Optional[str] = None
+    has_storage: Optional[bool] = False
+    storage_size: Optional[str] = None
+    has_autoscaling: Optional[bool] = False
+    replicas: Optional[str] = None
+    has_auto_backup: Optional[bool] = False
+    backup_count: Optional[int] = 0
+
+
+def pod_values(pods: int) -> list:
+    types = ["nginx", "postgres", "redis", "custom", "wordpress", "mysql", "uptime"]
+    values = []
+    for i in range(pods):
+        app_type = f"{types[i % len(types)]}-{1000 + i}"
+        values.append({
+            "name": f"{app_type}-7c9f8d6b5-{i:05x}", "status": "Running" if i % 10 else "CrashLoopBackOff",
+            "cost": 5.0 + i % 4 * 5, "type": app_type, "age": f"{i % 30} days, 4:12:09",
+            "image": f"registry.example.com/{types[i % len(types)]}:1.{i % 20}", "restarts": i % 3,
+            "message": None if i % 10 else "back-off 5m0s restarting failed container",
+            "pod_ip": f"10.244.{i // 250}.{i % 250}", "node_name": f"worker-{i % 5}",
+            "external_url": f"http://{app_type}.apps.example.com", "public_ip": "192.168.154.114",
+            "node_port": 30000 + i, "group_id": f"grp-{i // 2}" if i % 7 == 0 else None,
+            "has_storage": i % 3 == 0, "storage_size": "5Gi" if i % 3 == 0 else None,
+            "has_autoscaling": i % 4 == 0, "replicas": "2/5" if i % 4 == 0 else None,
+            "has_auto_backup": i % 5 == 0, "backup_count": i % 6,
+        })
+    return values
+
+
+def before(values: list) -> bytes:
+    models = [PodInfo(**v) for v in values]
+    revalidated = [PodInfo(**to_dict(m)) for m in models]
+    return json.dumps(jsonable_encoder(revalidated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def after(values: list) -> bytes:
+    return dumps([construct(PodInfo, **v) for v in values])
+
+
+def measure(fn, arg, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pods", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    values = pod_values(args.pods)
+    before_ms, before_body = measure(before, values, args.repeat)
+    after_ms, after_body = measure(after, values, args.repeat)
+    if json.loads(before_body) != json.loads(after_body):
+        print("bodies differ!", file=sys.stderr)
+        return 1
+
+    print(f"{args.pods} pods, median of {args.repeat}")
+    print(f"{'path':24} {'ms':>8} {'bytes':>10}")
+    print(f"{'before (validate+json)':24} {before_ms:>8.2f} {len(before_body):>10}")
+    print(f"{'after (construct+orjson)':24} {after_ms:>8.2f} {len(after_body):>10}")
+    print(f"speed-up {before_ms / after_ms:.1f}x")
+
+    encoders = [("gzip-6", lambda body: gzip.compress(body, compresslevel=6))]
+    if brotli is not None:
+        encoders.append(("br-4", lambda body: brotli.compress(body, quality=4)))
+    for name, encode in encoders:
+        ms, compressed = measure(encode, after_body, args.repeat)
+        print(f"{name:24} {ms:>8.2f} {len(compressed):>10}  ({len(compressed) / len(after_body):.0%} of raw)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
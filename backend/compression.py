@@ -0,0 +1,122 @@
+"""
+Response compression negotiated with Accept-Encoding (brotli when available, else gzip).
+
+Only complete bodies of at least `minimum_size` bytes are compressed. Streaming responses
+(log follow, SSE) pass through untouched: compressing them would hold chunks back in the
+compressor until enough data arrived, which is exactly what following a log must not do.
+brotli is optional; without the package only gzip is offered.
+
+A strong ETag must change with the bytes, so a compressed response gets the encoding appended
+to its ETag ("<hash>-gzip"); base_etag() maps it back for If-None-Match comparisons, and a 304
+answering such a tag repeats it.
+"""
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+ENCODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of the `encoding`-compressed representation (weak ETags stay as they are)"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def base_etag(etag: str) -> str:
+    """The ETag of the uncompressed representation, for any tag encoded_etag() produced"""
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def choose_encoding(accept_encoding: str):
+    """The best encoding the client accepts (q=0 excluded), or None"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk tells whether the response streams
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                if start["status"] == 304 and "etag" in headers:
+                    # Repeat the tag the client has, if it is the compressed variant of this one
+                    variant = encoded_etag(headers["etag"], encoding)
+                    if variant in Headers(scope=scope).get("if-none-match", ""):
+                        headers["ETag"] = variant
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.compress(body, encoding)
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,63 @@
+"""
+SQLAlchemy engine setup for the user database.
+
+SQLite (the default, on the /data volume) runs in WAL mode with synchronous=NORMAL and a busy
+timeout, so readers never block on a writer and short write bursts wait instead of failing
+with "database is locked". Any other URL (Postgres) gets a pooled engine with pre-ping and
+recycling, which is what running several backend replicas needs.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+DEFAULT_DATABASE_URL = "sqlite:////data/users.db"
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def normalize_database_url(url: str) -> str:
+    # Heroku-style postgres:// URLs are not accepted by SQLAlchemy 1.4+
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def create_database_engine(url: str = DEFAULT_DATABASE_URL, pool_size: int = 10, max_overflow: int = 20,
+                           pool_timeout: int = 30, pool_recycle: int = 1800, pool_pre_ping: bool = True,
+                           sqlite_busy_timeout_ms: int = 5000):
+    url = normalize_database_url(url)
+    if not is_sqlite(url):
+        return create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+        )
+
+    connect_args = {"check_same_thread": False, "timeout": sqlite_busy_timeout_ms / 1000}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection, otherwise every pooled connection gets its own empty database
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(sqlite_busy_timeout_ms)}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    return engine
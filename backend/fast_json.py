@@ -0,0 +1,41 @@
+"""
+orjson responses and unvalidated models for payloads the server builds itself.
+
+FastAPI validates whatever an endpoint returns against its response_model and then runs
+jsonable_encoder and json.dumps over the result. For data that never came from a client
+(PodInfo lists, /monitoring) that is pure overhead: construct() builds a model without
+validation and ORJSONResponse serializes dicts, datetimes and models in a single C pass.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def construct(model_cls, **values):
+    """model_cls(**values) without validation; only for values the server computed itself"""
+    if hasattr(model_cls, "model_construct"):
+        return model_cls.model_construct(**values)
+    return model_cls.construct(**values)  # pydantic 1
+
+
+def to_dict(model: BaseModel) -> dict:
+    if hasattr(model, "model_dump"):
+        return model.model_dump()
+    return model.dict()  # pydantic 1
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return to_dict(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (models in the content are dumped as dicts)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
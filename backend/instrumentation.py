@@ -0,0 +1,265 @@
+"""
+Prometheus metrics for the HTTP API and the Kubernetes API calls made on its behalf.
+
+MetricsMiddleware records latency, status and in-flight requests per route template
+(/pods/{pod_name}/logs, never the concrete path, so the label set stays bounded).
+InstrumentedApi wraps a kubernetes client API object (CoreV1Api, ...) and times every method
+call, labeled by verb and resource, so a dashboard can show which endpoint hammers the
+API server. Both are exposed on /metrics in the Prometheus text format.
+
+K8sCallAccountingMiddleware adds the per-request view: every call made while handling a
+request (also from the k8s executor, the context is carried along) is added to that
+request's K8sCallAccount, reported in the X-K8s-Calls and Server-Timing headers and logged
+when the request exceeds its call budget. N+1 patterns show up as a call count that grows
+with the namespace instead of staying flat.
+"""
+import contextvars
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by status code", ["method", "route", "status"])
+HTTP_REQUEST_ERRORS = Counter(
+    "http_request_errors_total", "HTTP requests that failed with a 5xx or an unhandled exception", ["method", "route"])
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled", ["method"])
+
+K8S_API_SECONDS = Histogram(
+    "kubernetes_api_call_duration_seconds",
+    "Kubernetes API call latency (watches and streamed calls: until the response starts)",
+    ["api", "verb", "resource"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+K8S_API_ERRORS = Counter(
+    "kubernetes_api_call_errors_total", "Kubernetes API calls that raised, by HTTP status", ["api", "verb", "resource", "status"])
+K8S_API_RESPONSE_BYTES = Counter("kubernetes_api_response_bytes_total", "Bytes received from the Kubernetes API", ["api"])
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Longest first: delete_collection_namespaced_job is a delete_collection, not a delete
+K8S_VERBS = ("delete_collection", "connect", "create", "delete", "list", "patch", "read", "replace", "watch", "get")
+
+
+def route_template(scope) -> str:
+    """The path template of the route that handled the request"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    app = scope.get("app")
+    for candidate in getattr(app, "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return candidate.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.labels(method).dec()
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            if status >= 500:
+                HTTP_REQUEST_ERRORS.labels(method, route).inc()
+
+
+def split_operation(name: str) -> tuple:
+    """(verb, resource) of a client method: list_namespaced_pod -> ("list", "pod")"""
+    for verb in K8S_VERBS:
+        if name == verb or name.startswith(verb + "_"):
+            resource = name[len(verb) + 1:]
+            break
+    else:
+        return name, ""
+    resource = re.sub(r"_with_http_info$", "", resource)
+    resource = re.sub(r"^(get_|post_|put_|patch_|delete_|head_|options_)", "", resource) if verb == "connect" else resource
+    resource = resource.replace("namespaced_", "").replace("_for_all_namespaces", "")
+    return verb, resource
+
+
+class K8sCallAccount:
+    """Kubernetes API calls, response bytes and wall time of one request (updated from several threads)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.operations = Tally()  # "verb resource" -> calls
+        self._lock = threading.Lock()
+
+    def add_call(self, verb: str, resource: str, seconds: float):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+            self.operations[f"{verb} {resource}"] += 1
+
+    def add_bytes(self, count: int):
+        with self._lock:
+            self.bytes += count
+
+    def server_timing(self) -> str:
+        return f'k8s;dur={self.seconds * 1000:.1f};desc="{self.calls} calls, {self.bytes} bytes"'
+
+    def summary(self) -> str:
+        return ", ".join(f"{operation} x{count}" for operation, count in self.operations.most_common())
+
+
+current_account: contextvars.ContextVar[Optional[K8sCallAccount]] = contextvars.ContextVar("k8s_call_account", default=None)
+
+
+@contextmanager
+def timed_k8s_call(api: str, verb: str, resource: str):
+    """Time a Kubernetes API call made outside an InstrumentedApi (e.g. api_client.call_api)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        K8S_API_ERRORS.labels(api, verb, resource, str(getattr(e, "status", None) or "error")).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        K8S_API_SECONDS.labels(api, verb, resource).observe(elapsed)
+        account = current_account.get()
+        if account is not None:
+            account.add_call(verb, resource, elapsed)
+
+
+def count_response_bytes(api_client, api: str):
+    """Make an ApiClient report the size of every response body (once per ApiClient).
+
+    Hooks the REST client that every kubernetes client version sends requests through;
+    a client without one is left uncounted rather than failing at startup.
+    """
+    rest_client = getattr(api_client, "rest_client", None)
+    request = getattr(rest_client, "request", None)
+    if request is None or getattr(rest_client, "_counts_response_bytes", False):
+        return
+
+    @functools.wraps(request)
+    def counted_request(*args, **kwargs):
+        response = request(*args, **kwargs)
+        data = getattr(response, "data", None) if kwargs.get("_preload_content", True) else None
+        if isinstance(data, (bytes, str)):
+            size = len(data)
+        else:
+            # Streamed (logs, watches) or not read yet: reading .data would consume the stream
+            headers = getattr(response, "headers", None) or {}
+            size = int(headers.get("Content-Length") or 0)
+        K8S_API_RESPONSE_BYTES.labels(api).inc(size)
+        account = current_account.get()
+        if account is not None:
+            account.add_bytes(size)
+        return response
+
+    rest_client.request = counted_request
+    rest_client._counts_response_bytes = True
+
+
+class K8sCallAccountingMiddleware:
+    """Per-request Kubernetes call accounting (see module docstring).
+
+    budget: requests making more calls than this are logged (0 disables); headers: whether
+    X-K8s-Calls and Server-Timing are added to responses.
+    """
+
+    def __init__(self, app, budget: int = 25, headers: bool = True, log=None):
+        self.app = app
+        self.budget = budget
+        self.headers = headers
+        self.log = log or logging.getLogger(__name__).warning
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        account = K8sCallAccount()
+        token = current_account.set(account)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and self.headers:
+                # Streaming responses: only the calls made before the first byte
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-k8s-calls", str(account.calls).encode()),
+                    (b"server-timing", account.server_timing().encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_account.reset(token)
+            if self.budget and account.calls > self.budget:
+                self.log("Kubernetes call budget exceeded: %s %s made %d Kubernetes calls (budget %d) in %.0f ms, %d bytes: %s",
+                         scope["method"], route_template(scope), account.calls, self.budget, account.seconds * 1000,
+                         account.bytes, account.summary())
+
+
+class InstrumentedApi:
+    """Proxy of a kubernetes client API object that times every method call.
+
+    functools.wraps keeps __doc__ on the wrappers (watch.Watch reads the return type from it),
+    and non-callable attributes such as api_client are passed through unchanged.
+    """
+
+    def __init__(self, api, name: str = None):
+        self._api = api
+        self._name = name or type(api).__name__
+        self._wrapped = {}
+        count_response_bytes(api.api_client, self._name)
+
+    def __getattr__(self, attr):
+        target = getattr(self._api, attr)
+        if attr.startswith("_") or not callable(target):
+            return target
+        wrapper = self._wrapped.get(attr)
+        if wrapper is None:
+            wrapper = self._wrapped[attr] = self._instrument(attr, target)
+        return wrapper
+
+    def _instrument(self, attr, method):
+        api = self._name
+        verb, resource = split_operation(attr)
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            # Custom objects are told apart by their plural (pods, nodes, ...)
+            with timed_k8s_call(api, "watch" if kwargs.get("watch") else verb, kwargs.get("plural") or resource):
+                return method(*args, **kwargs)
+
+        return call
@@ -0,0 +1,445 @@
+"""
+In-process cluster cache (informer-style) for the tenant namespaces.
+
+Every resource kind is listed once and then kept up to date with a watch, so the
+read endpoints can answer from memory instead of hitting the API server on each poll.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from kubernetes import client, watch
+
+logger = logging.getLogger(__name__)
+
+TENANT_NAMESPACE_PREFIX = "org-"
+WATCH_TIMEOUT_SECONDS = 300
+# Per-namespace stream watchers: a stopped watch only notices at the next event or timeout,
+# so keep the timeout short to release the connection soon after the last subscriber leaves
+NAMESPACE_WATCH_TIMEOUT_SECONDS = 30
+RETRY_BACKOFF_SECONDS = 5
+CHANGE_LOG_SIZE = 2000  # change entries kept per namespace for delta cursors
+
+# ownerReference kind -> cache kind, for walking Pod -> ReplicaSet -> Deployment
+OWNER_KINDS = {"ReplicaSet": "replicasets", "Deployment": "deployments", "Job": "jobs", "CronJob": "cronjobs"}
+
+
+def parse_label_selector(selector: Optional[str]) -> list:
+    """Parse an equality-based label selector ("a=b,c!=d,e,!f") into (key, op, value) tuples"""
+    requirements = []
+    if not selector:
+        return requirements
+    for part in selector.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "!=" in part:
+            key, value = part.split("!=", 1)
+            requirements.append((key.strip(), "!=", value.strip()))
+        elif "==" in part:
+            key, value = part.split("==", 1)
+            requirements.append((key.strip(), "=", value.strip()))
+        elif "=" in part:
+            key, value = part.split("=", 1)
+            requirements.append((key.strip(), "=", value.strip()))
+        elif part.startswith("!"):
+            requirements.append((part[1:].strip(), "!", None))
+        else:
+            requirements.append((part, "exists", None))
+    return requirements
+
+
+def labels_match(labels: Optional[dict], requirements: list) -> bool:
+    labels = labels or {}
+    for key, op, value in requirements:
+        if op == "=" and labels.get(key) != value:
+            return False
+        if op == "!=" and labels.get(key) == value:
+            return False
+        if op == "exists" and key not in labels:
+            return False
+        if op == "!" and key in labels:
+            return False
+    return True
+
+
+class Reflector:
+    """Lists one resource kind and then watches it, feeding every change into the cache"""
+
+    def __init__(self, kind: str, list_func: Callable, cache: "ClusterCache", watch_timeout: int = WATCH_TIMEOUT_SECONDS):
+        self.kind = kind
+        self.list_func = list_func
+        self.cache = cache
+        self.watch_timeout = watch_timeout
+        self.resource_version = None
+        self.last_sync = None
+        self.last_event = None
+        self.relists = 0
+        self.synced = threading.Event()
+        self._watch = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"reflector-{self.kind}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watch:
+            self._watch.stop()
+
+    def _list(self):
+        result = self.list_func()
+        self.cache._replace(self.kind, result.items)
+        self.resource_version = result.metadata.resource_version
+        self.last_sync = time.time()
+        self.relists += 1
+        self.synced.set()
+
+    def _watch_once(self):
+        self._watch = watch.Watch()
+        # stop() sets the event before it stops self._watch: checking after the assignment
+        # means either this sees the event or stop() sees this watch
+        if self._stopped.is_set():
+            return
+        for event in self._watch.stream(
+            self.list_func,
+            resource_version=self.resource_version,
+            timeout_seconds=self.watch_timeout,
+            allow_watch_bookmarks=True,
+        ):
+            if self._stopped.is_set():
+                break
+            event_type = event["type"]
+            if event_type == "ERROR":
+                raw = event.get("raw_object") or {}
+                raise client.exceptions.ApiException(status=raw.get("code", 500), reason=raw.get("reason"))
+            obj = event["object"]
+            resource_version = obj.metadata.resource_version if obj.metadata else None
+            if event_type != "BOOKMARK":
+                self.cache._apply(self.kind, event_type, obj)
+            if resource_version:
+                self.resource_version = resource_version
+            self.last_event = time.time()
+
+    def _run(self):
+        needs_list = True
+        while not self._stopped.is_set():
+            try:
+                if needs_list:
+                    self._list()
+                    needs_list = False
+                    if self._stopped.is_set():
+                        break
+                self._watch_once()
+            except client.exceptions.ApiException as e:
+                if e.status == 410:
+                    # resourceVersion te oud (compaction) - opnieuw een volledige list doen
+                    logger.info("%s: resourceVersion expired, relisting", self.kind)
+                    needs_list = True
+                    continue
+                logger.warning("%s: watch failed (%s %s), retrying", self.kind, e.status, e.reason)
+                needs_list = True
+                self._stopped.wait(RETRY_BACKOFF_SECONDS)
+            except Exception as e:
+                logger.warning("%s: watch error: %s, retrying", self.kind, e)
+                needs_list = True
+                self._stopped.wait(RETRY_BACKOFF_SECONDS)
+
+    def freshness(self) -> dict:
+        now = time.time()
+        return {
+            "synced": self.synced.is_set(),
+            "resource_version": self.resource_version,
+            "seconds_since_list": round(now - self.last_sync, 1) if self.last_sync else None,
+            "seconds_since_event": round(now - self.last_event, 1) if self.last_event else None,
+            "relists": self.relists,
+        }
+
+
+class ClusterCache:
+    """Shared store of cluster objects, indexed by kind -> namespace -> name"""
+
+    def __init__(self, list_funcs: Dict[str, Callable], namespace_prefix: str = TENANT_NAMESPACE_PREFIX,
+                 watch_timeout: int = WATCH_TIMEOUT_SECONDS):
+        self.namespace_prefix = namespace_prefix
+        self._lock = threading.RLock()
+        self._objects = {kind: {} for kind in list_funcs}
+        self._reflectors = {kind: Reflector(kind, fn, self, watch_timeout) for kind, fn in list_funcs.items()}
+        self._listeners = []
+        self.started = False
+        # Change log for delta listings: cursors are "<epoch>.<seq>", the epoch makes cursors
+        # from an earlier process (or another replica) fall back to a full snapshot
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._changes = {}
+        self._change_floor = {}
+        self._namespace_seq = {}
+
+    # --- lifecycle ---
+
+    def start(self):
+        for reflector in self._reflectors.values():
+            reflector.start()
+        self.started = True
+
+    def stop(self):
+        for reflector in self._reflectors.values():
+            reflector.stop()
+        self.started = False
+
+    def wait_for_sync(self, timeout: float = 10.0) -> bool:
+        deadline = time.time() + timeout
+        for reflector in self._reflectors.values():
+            if not reflector.synced.wait(max(0.0, deadline - time.time())):
+                return False
+        return True
+
+    def add_listener(self, listener: Callable):
+        """Register listener(kind, event_type, obj); called from reflector threads after each change.
+        A relist is reported as event_type "RESYNC" with obj None."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, kind: str, event_type: str, obj):
+        for listener in list(self._listeners):
+            try:
+                listener(kind, event_type, obj)
+            except Exception as e:
+                logger.exception("Cache listener error: %s", e)
+
+    # --- store mutations (called from reflector threads) ---
+
+    def _tracked(self, obj) -> bool:
+        return bool(obj.metadata and obj.metadata.namespace and obj.metadata.namespace.startswith(self.namespace_prefix))
+
+    def _record(self, kind: str, event_type: str, ns_name: str, name: str):
+        """Append to the namespace change log (caller holds the lock)"""
+        self._seq += 1
+        log = self._changes.get(ns_name)
+        if log is None:
+            log = self._changes[ns_name] = deque()
+        if len(log) >= CHANGE_LOG_SIZE:
+            self._change_floor[ns_name] = log.popleft()[0]
+        log.append((self._seq, kind, name, event_type))
+        self._namespace_seq.setdefault(ns_name, {})[kind] = self._seq
+
+    def _replace(self, kind: str, items: list):
+        store = {}
+        for obj in items:
+            if self._tracked(obj):
+                store.setdefault(obj.metadata.namespace, {})[obj.metadata.name] = obj
+        with self._lock:
+            # A relist can hide deletes/updates we never saw as events: diff old against new
+            old_store = self._objects[kind]
+            for ns_name in set(old_store) | set(store):
+                old_objs = old_store.get(ns_name, {})
+                new_objs = store.get(ns_name, {})
+                for name, obj in new_objs.items():
+                    previous = old_objs.get(name)
+                    if previous is None:
+                        self._record(kind, "ADDED", ns_name, name)
+                    elif previous.metadata.resource_version != obj.metadata.resource_version:
+                        self._record(kind, "MODIFIED", ns_name, name)
+                for name in old_objs:
+                    if name not in new_objs:
+                        self._record(kind, "DELETED", ns_name, name)
+            self._objects[kind] = store
+        self._notify(kind, "RESYNC", None)
+
+    def _apply(self, kind: str, event_type: str, obj):
+        if not self._tracked(obj):
+            return
+        ns_name = obj.metadata.namespace
+        with self._lock:
+            namespace_store = self._objects[kind].setdefault(ns_name, {})
+            if event_type == "DELETED":
+                namespace_store.pop(obj.metadata.name, None)
+                if not namespace_store:
+                    self._objects[kind].pop(ns_name, None)
+            else:
+                namespace_store[obj.metadata.name] = obj
+            self._record(kind, event_type, ns_name, obj.metadata.name)
+        self._notify(kind, event_type, obj)
+
+    # --- reads ---
+
+    def serves(self, kind: str, namespace: Optional[str] = None) -> bool:
+        """True when reads for this kind (and namespace) can be answered from memory"""
+        reflector = self._reflectors.get(kind)
+        if not reflector or not reflector.synced.is_set():
+            return False
+        return namespace is None or namespace.startswith(self.namespace_prefix)
+
+    def list(self, kind: str, namespace: str, label_selector: Optional[str] = None) -> List:
+        requirements = parse_label_selector(label_selector)
+        with self._lock:
+            items = list(self._objects[kind].get(namespace, {}).values())
+        if requirements:
+            items = [obj for obj in items if labels_match(obj.metadata.labels, requirements)]
+        return items
+
+    def list_all(self, kind: str) -> Dict[str, List]:
+        """All tracked objects of a kind, grouped by namespace"""
+        with self._lock:
+            return {ns_name: list(objs.values()) for ns_name, objs in self._objects[kind].items()}
+
+    def get(self, kind: str, namespace: str, name: str):
+        with self._lock:
+            return self._objects[kind].get(namespace, {}).get(name)
+
+    def resolve_owner(self, kind: str, namespace: str, name: str, owner_kind: str) -> Optional[str]:
+        """Name of the owner_kind controller of an object, following controller ownerReferences
+        through the cache (Pod -> ReplicaSet -> Deployment). Dict lookups only, no API calls."""
+        with self._lock:
+            obj = self._objects.get(kind, {}).get(namespace, {}).get(name)
+            for _ in range(len(OWNER_KINDS) + 1):
+                if obj is None:
+                    return None
+                refs = obj.metadata.owner_references or []
+                ref = next((r for r in refs if r.controller), refs[0] if refs else None)
+                if ref is None:
+                    return None
+                if ref.kind == owner_kind:
+                    return ref.name
+                next_kind = OWNER_KINDS.get(ref.kind)
+                if next_kind not in self._objects:
+                    return None
+                obj = self._objects[next_kind].get(namespace, {}).get(ref.name)
+        return None
+
+    def cursor(self) -> str:
+        """Opaque position in the change log; take it before reading so nothing is missed"""
+        with self._lock:
+            return f"{self._epoch}.{self._seq}"
+
+    def namespace_version(self, namespace: str, kinds: List[str]) -> str:
+        """Version of a namespace's objects of the given kinds: changes whenever one of them does"""
+        with self._lock:
+            seqs = self._namespace_seq.get(namespace, {})
+            return f"{self._epoch}.{max((seqs.get(kind, 0) for kind in kinds), default=0)}"
+
+    def changes_since(self, namespace: str, cursor: str, kinds: List[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """{kind: {name: last event type}} for changes after cursor, or None when the cursor is
+        unknown or older than the retained change log (the caller should send a full snapshot)"""
+        try:
+            epoch, seq = cursor.split(".", 1)
+            seq = int(seq)
+        except ValueError:
+            return None
+        with self._lock:
+            if epoch != self._epoch or seq > self._seq or seq < self._change_floor.get(namespace, 0):
+                return None
+            result = {kind: {} for kind in kinds}
+            # Newest first, so the last event per object wins
+            for entry_seq, kind, name, event_type in reversed(self._changes.get(namespace, ())):
+                if entry_seq <= seq:
+                    break
+                if kind in result:
+                    result[kind].setdefault(name, event_type)
+        return result
+
+    def freshness(self) -> dict:
+        return {kind: reflector.freshness() for kind, reflector in self._reflectors.items()}
+
+
+def namespaced_list_func(list_func: Callable, namespace: str) -> Callable:
+    """Bind a list_namespaced_* function to one namespace, keeping the docstring watch.Watch
+    uses to find the return type"""
+    def list_in_namespace(**kwargs):
+        return list_func(namespace=namespace, **kwargs)
+    list_in_namespace.__doc__ = list_func.__doc__
+    list_in_namespace.__name__ = list_func.__name__
+    return list_in_namespace
+
+
+class Subscription:
+    """Event queue of one stream client, fed from reflector threads into its event loop"""
+
+    def __init__(self, namespace: str, loop: asyncio.AbstractEventLoop, maxsize: int = 1000):
+        self.namespace = namespace
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, item):
+        if self.queue.full():
+            # Client kan het niet bijhouden: gooi de backlog weg en laat hem opnieuw een snapshot halen
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            item = ("RESYNC", None)
+        self.queue.put_nowait(item)
+
+    def publish(self, event_type: str, obj):
+        self.loop.call_soon_threadsafe(self._put, (event_type, obj))
+
+    async def get(self, timeout: float):
+        return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+
+
+class NamespaceEventHub:
+    """Fans out the change events of one kind to the stream clients of each namespace.
+
+    While the cluster cache runs, its cluster-wide watch is the only upstream. Without it,
+    the first subscriber of a namespace starts a namespaced watch that all later subscribers
+    share, and the last one to leave stops it.
+    """
+
+    def __init__(self, kind: str, cache: ClusterCache, namespaced_list: Callable):
+        self.kind = kind
+        self.cache = cache
+        self.namespaced_list = namespaced_list
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._watchers = {}
+        cache.add_listener(self._on_event)
+
+    def _on_event(self, kind: str, event_type: str, obj, namespace: Optional[str] = None):
+        """namespace: set for the events of a per-namespace watcher, whose relists only
+        concern that namespace; a relist of the shared cache resyncs every subscriber"""
+        if kind != self.kind:
+            return
+        with self._lock:
+            if namespace is not None:
+                targets = list(self._subscribers.get(namespace, ()))
+            elif obj is None:
+                targets = [sub for subs in self._subscribers.values() for sub in subs]
+            else:
+                targets = list(self._subscribers.get(obj.metadata.namespace, ()))
+        for sub in targets:
+            sub.publish(event_type, obj)
+
+    def subscribe(self, namespace: str, loop: asyncio.AbstractEventLoop) -> Subscription:
+        sub = Subscription(namespace, loop)
+        with self._lock:
+            self._subscribers.setdefault(namespace, []).append(sub)
+            if not self.cache.started and namespace not in self._watchers:
+                watcher = ClusterCache({self.kind: namespaced_list_func(self.namespaced_list, namespace)},
+                                       watch_timeout=NAMESPACE_WATCH_TIMEOUT_SECONDS)
+                watcher.add_listener(functools.partial(self._on_event, namespace=namespace))
+                watcher.start()
+                self._watchers[namespace] = watcher
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.namespace, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._subscribers.pop(sub.namespace, None)
+                watcher = self._watchers.pop(sub.namespace, None)
+                if watcher:
+                    watcher.stop()
+
+    def subscriber_count(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(namespace, ()))
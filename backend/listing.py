@@ -0,0 +1,75 @@
+"""
+Pagination, filtering and field selection for the list endpoints.
+
+Pages are requested with ?limit=N and continued with the opaque token the previous page
+returned in the X-Continue header (no header: last page). A token either wraps a Kubernetes
+list continue token or holds the sort key of the last item returned (keyset pagination), so
+pages stay consistent when items are added or removed in between. A filtered page can hold
+fewer than `limit` items; only a missing X-Continue means the end.
+
+?fields=name,status returns only those keys of every item, so a view that renders three
+columns does not pay for serializing thirty.
+"""
+import base64
+import json
+from typing import Callable, Iterable, Optional
+
+KUBERNETES_TOKEN = "k"  # continue token of a Kubernetes list call
+KEYSET_TOKEN = "n"      # sort key of the last item returned
+
+
+class InvalidListQuery(ValueError):
+    pass
+
+
+def encode_continue(*values) -> str:
+    """Opaque continue token for the given values"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_continue(token: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or not values:
+        raise InvalidListQuery("Invalid continue token")
+    return values
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], always: tuple = ("name",)) -> Optional[tuple]:
+    """The keys asked for with ?fields=a,b (plus the identifying ones); None means all of them"""
+    if not fields:
+        return None
+    allowed = set(allowed)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - allowed)
+    if unknown:
+        raise InvalidListQuery(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys([f for f in always if f in allowed] + wanted))
+
+
+def project(items: list, fields: Optional[tuple]) -> list:
+    """Restrict every item (a dict) to `fields`"""
+    if fields is None:
+        return items
+    return [{f: item.get(f) for f in fields} for item in items]
+
+
+def keyset_page(items: list, limit: Optional[int], after=None, key: Callable = lambda item: item["name"],
+                reverse: bool = False):
+    """One page of `items` (already sorted by `key`, descending with reverse) after the key `after`.
+
+    Returns (page, next_key); next_key is None on the last page.
+    """
+    if after is not None:
+        items = [item for item in items if (key(item) < after if reverse else key(item) > after)]
+    if limit is None or len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    return page, key(page[-1])
+
+
+def matches(item: dict, filters: dict) -> bool:
+    """True when every filter that was given (not None) equals the item's value"""
+    return all(value is None or item.get(field) == value for field, value in filters.items())
@@ -0,0 +1,486 @@
+"""
+Persistent log archive for the tenant pods.
+
+An archiver thread periodically tails every tenant pod (timestamps=true, since the last
+archived line) and appends the new lines to gzip segments on the /data volume:
+
+    <root>/<namespace>/<deployment>/<first-epoch>.log.gz   append-only, one gzip member per batch
+    <root>/<namespace>/<deployment>/<first-epoch>.idx.json time range, pods, token bloom filter
+
+Searches only decompress the segments whose index overlaps the time range and whose bloom
+filter may contain every query token. Retention is enforced per tenant by size.
+
+Cost: every round makes one log read (proxied by the API server to the kubelet) per container
+of every archived pod, whether or not anyone searches; with a 60 s interval and 2000 containers
+that is ~33 requests/s of steady API server load. status() reports the calls per round. Keep
+it down with a longer interval or by archiving only the pods matching a label selector
+(e.g. "log-archive=true" on the deployments that want it).
+"""
+import base64
+import calendar
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from kubernetes import client
+
+from k8s_cache import TENANT_NAMESPACE_PREFIX, labels_match, parse_label_selector
+from log_stream import timestamp_key
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+SEGMENT_MAX_SECONDS = 6 * 3600
+BLOOM_BITS = 2 ** 17  # 16 KiB per segment
+BLOOM_HASHES = 3
+BLOOM_MAX_FILL = 0.3  # roll the segment before false positives get above ~3%
+FIRST_READ_TAIL_LINES = 1000  # how far back a pod is read the first time it is seen
+READ_WORKERS = 4
+
+_TOKEN_RE = re.compile(rb"[A-Za-z0-9_]+")
+_SAFE_NAME_RE = re.compile(r"^[a-z0-9]([-a-z0-9.]*[a-z0-9])?$")  # DNS-1123, never a path
+
+
+def tokenize(text: bytes) -> set:
+    return {token.lower() for token in _TOKEN_RE.findall(text)}
+
+
+def parse_log_timestamp(stamp: bytes) -> float:
+    """RFC3339(Nano) timestamp of a log line -> epoch seconds"""
+    seconds, _, fraction = stamp.rstrip(b"Z").partition(b".")
+    epoch = calendar.timegm(time.strptime(seconds.decode(), "%Y-%m-%dT%H:%M:%S"))
+    return epoch + (int(fraction[:6].ljust(6, b"0")) / 1e6 if fraction else 0.0)
+
+
+def parse_time(value: str) -> float:
+    """Query time: epoch seconds or RFC3339. Raises ValueError."""
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            return calendar.timegm(moment.timetuple()) + moment.microsecond / 1e6
+        return moment.timestamp()
+
+
+def archive_name(pod) -> str:
+    """Directory name for a pod's logs: its deployment, derived without API calls from the
+    ReplicaSet owner and the pod-template-hash label; otherwise the owner or the pod itself"""
+    owner = None
+    for ref in pod.metadata.owner_references or []:
+        if ref.controller:
+            owner = ref
+            break
+    if owner is None:
+        return pod.metadata.name
+    template_hash = (pod.metadata.labels or {}).get("pod-template-hash")
+    if owner.kind == "ReplicaSet" and template_hash and owner.name.endswith("-" + template_hash):
+        return owner.name[:-len(template_hash) - 1]
+    return owner.name
+
+
+class BloomFilter:
+    def __init__(self, bits: bytearray = None, size: int = BLOOM_BITS, hashes: int = BLOOM_HASHES):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray(size // 8)
+        self.set_bits = sum(bin(byte).count("1") for byte in self.bits) if bits is not None else 0
+
+    def _positions(self, token: bytes):
+        digest = hashlib.blake2b(token, digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], "little")
+        h2 = int.from_bytes(digest[4:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, token: bytes):
+        for position in self._positions(token):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                self.set_bits += 1
+
+    def might_contain(self, token: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(token))
+
+    @property
+    def fill(self) -> float:
+        return self.set_bits / self.size
+
+    def encode(self) -> str:
+        return base64.b64encode(bytes(self.bits)).decode()
+
+    @classmethod
+    def decode(cls, data: str, size: int, hashes: int) -> "BloomFilter":
+        return cls(bytearray(base64.b64decode(data)), size, hashes)
+
+
+class Segment:
+    """An append-only gzip segment plus its in-memory index"""
+
+    def __init__(self, path: str, index: dict, bloom: BloomFilter):
+        self.path = path
+        self.index = index
+        self.bloom = bloom
+
+    @property
+    def index_path(self) -> str:
+        return index_path(self.path)
+
+    @classmethod
+    def create(cls, directory: str, first_ts: float) -> "Segment":
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{int(first_ts)}")
+        path, n = f"{base}.log.gz", 1
+        while os.path.exists(path):
+            path, n = f"{base}-{n}.log.gz", n + 1
+        index = {"from": first_ts, "to": first_ts, "lines": 0, "bytes": 0, "pods": [],
+                 "created": time.time(), "bloom_bits": BLOOM_BITS, "bloom_hashes": BLOOM_HASHES}
+        return cls(path, index, BloomFilter())
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Segment"]:
+        index = read_index(path)
+        if index is None:
+            return None
+        bloom = BloomFilter.decode(index.pop("bloom"), index["bloom_bits"], index["bloom_hashes"])
+        return cls(path, index, bloom)
+
+    def is_full(self) -> bool:
+        return (self.index["bytes"] >= SEGMENT_MAX_BYTES
+                or time.time() - self.index["created"] >= SEGMENT_MAX_SECONDS
+                or self.bloom.fill >= BLOOM_MAX_FILL)
+
+    def append(self, records: List[tuple]):
+        """records: (epoch, line bytes, pod name) in timestamp order"""
+        tokens = set()
+        with gzip.open(self.path, "ab") as f:
+            for _, line, _ in records:
+                f.write(line + b"\n")
+                tokens |= tokenize(line)
+        for token in tokens:
+            self.bloom.add(token)
+        pods = set(self.index["pods"])
+        pods.update(pod for _, _, pod in records)
+        self.index["pods"] = sorted(pods)
+        self.index["from"] = min(self.index["from"], records[0][0]) if self.index["lines"] else records[0][0]
+        self.index["to"] = max(self.index["to"], records[-1][0])
+        self.index["lines"] += len(records)
+        self.index["bytes"] = os.path.getsize(self.path)
+        self.write_index()
+
+    def write_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({**self.index, "bloom": self.bloom.encode()}, f)
+        os.replace(tmp, self.index_path)
+
+
+def index_path(segment_path: str) -> str:
+    return segment_path[:-len(".log.gz")] + ".idx.json"
+
+
+def read_index(segment_path: str) -> Optional[dict]:
+    try:
+        with open(index_path(segment_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class LogArchiver:
+    """Tails the tenant pods into per-deployment segments and answers searches over them"""
+
+    def __init__(self, root: str, list_pods: Callable[[Optional[str]], list], read_log: Callable, interval: int = 60,
+                 tenant_max_bytes: int = 256 * 1024 * 1024, namespace_prefix: str = TENANT_NAMESPACE_PREFIX,
+                 label_selector: Optional[str] = None):
+        self.root = root
+        self.list_pods = list_pods  # namespace or None (all) -> pods
+        self.label_selector = parse_label_selector(label_selector)
+        self.read_log = read_log
+        self.interval = interval
+        self.tenant_max_bytes = tenant_max_bytes
+        self.namespace_prefix = namespace_prefix
+        self.started = False
+        self.last_round = None
+        self.last_error = None
+        self.last_round_calls = 0
+        self.total_calls = 0
+        self.skipped_collects = 0
+        self._cursors: Dict[str, bytes] = {}  # "ns/pod/container" -> last archived timestamp
+        self._segments: Dict[tuple, Segment] = {}
+        self._round_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="log-archive")
+        self._thread = None
+
+    @property
+    def cursor_path(self) -> str:
+        return os.path.join(self.root, "cursors.json")
+
+    def start(self):
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with open(self.cursor_path) as f:
+                self._cursors = {key: value.encode() for key, value in json.load(f).items()}
+        except (OSError, ValueError):
+            self._cursors = {}
+        self.started = True
+        self._thread = threading.Thread(target=self._run, name="log-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.collect()
+                self.last_error = None
+            except Exception as e:
+                if str(e) != self.last_error:
+                    logger.error("Archiving round failed: %s", e)
+                self.last_error = str(e)
+            self._stopped.wait(self.interval)
+
+    # ---------- archiving ----------
+
+    def collect(self, namespace: Optional[str] = None, deployments: Optional[set] = None,
+                timeout: Optional[float] = None) -> bool:
+        """One archiving round over all tenant pods, or over the pods of some deployments of one
+        namespace (e.g. right before a delete). With a timeout, gives up (returns False) when a
+        round is still running after that many seconds instead of waiting for it."""
+        if not self._round_lock.acquire(timeout=-1 if timeout is None else timeout):
+            self.skipped_collects += 1
+            return False
+        try:
+            self._collect(namespace, deployments)
+        finally:
+            self._round_lock.release()
+        return True
+
+    def _collect(self, namespace: Optional[str], deployments: Optional[set]):
+        targets = []
+        for pod in self.list_pods(namespace):
+            ns_name = pod.metadata.namespace or ""
+            if not ns_name.startswith(self.namespace_prefix) or (namespace and ns_name != namespace):
+                continue
+            if pod.status is None or pod.status.phase == "Pending":
+                continue
+            if not labels_match(pod.metadata.labels, self.label_selector):
+                continue
+            deployment = archive_name(pod)
+            if deployments is not None and deployment not in deployments and pod.metadata.name not in deployments:
+                continue
+            for container in pod.spec.containers or []:
+                targets.append((ns_name, pod.metadata.name, container.name, deployment))
+
+        batches: Dict[tuple, List[tuple]] = {}
+        for target, records in zip(targets, self._executor.map(self._read_new_lines, targets)):
+            if records:
+                ns_name, _, _, deployment = target
+                batches.setdefault((ns_name, deployment), []).extend(records)
+        self.total_calls += len(targets)
+
+        for key, records in batches.items():
+            records.sort(key=lambda record: timestamp_key(record[1]))
+            self._append(key, records)
+        if namespace is None:
+            live = {f"{ns}/{pod}/{container}" for ns, pod, container, _ in targets}
+            self._cursors = {key: value for key, value in self._cursors.items() if key in live}
+            self.last_round_calls = len(targets)
+            self.last_round = time.time()
+        self._save_cursors()
+        for ns_name in {ns for ns, _ in batches}:
+            self._enforce_retention(ns_name)
+
+    def _read_new_lines(self, target) -> List[tuple]:
+        ns_name, pod_name, container, _ = target
+        key = f"{ns_name}/{pod_name}/{container}"
+        last = self._cursors.get(key)
+        params = {"tail_lines": FIRST_READ_TAIL_LINES}
+        if last is not None:
+            # since_seconds has second granularity: read a little overlap and drop what we have
+            params = {"since_seconds": max(1, math.ceil(time.time() - parse_log_timestamp(last)) + 1)}
+        try:
+            resp = self.read_log(name=pod_name, namespace=ns_name, container=container,
+                                 timestamps=True, _preload_content=False, **params)
+            data = resp.data
+        except client.exceptions.ApiException:
+            return []
+        records = []
+        last_key = timestamp_key(last) if last is not None else None
+        for line in data.split(b"\n"):
+            if not line:
+                continue
+            stamp, _, message = line.partition(b" ")
+            try:
+                epoch = parse_log_timestamp(stamp)
+            except ValueError:
+                continue
+            if last_key is not None and timestamp_key(stamp) <= last_key:
+                continue
+            records.append((epoch, b"%s %s %s %s" % (stamp, pod_name.encode(), container.encode(), message), pod_name))
+            last = stamp
+        self._cursors[key] = last
+        return records
+
+    def _directory(self, ns_name: str, deployment: str) -> str:
+        return os.path.join(self.root, ns_name, deployment)
+
+    def _segment_paths(self, ns_name: str, deployment: Optional[str] = None) -> List[str]:
+        deployments = [deployment] if deployment else self.deployments(ns_name)
+        paths = []
+        for name in deployments:
+            directory = self._directory(ns_name, name)
+            if os.path.isdir(directory):
+                paths.extend(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".log.gz"))
+        return paths
+
+    def deployments(self, ns_name: str) -> List[str]:
+        directory = os.path.join(self.root, ns_name)
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def _append(self, key: tuple, records: List[tuple]):
+        segment = self._segments.get(key)
+        if segment is None:
+            # Continue the newest segment on disk after a restart
+            paths = sorted(self._segment_paths(*key), key=os.path.getmtime)
+            segment = Segment.load(paths[-1]) if paths else None
+        if segment is None or segment.is_full() or not os.path.exists(segment.path):
+            segment = Segment.create(self._directory(*key), records[0][0])
+        segment.append(records)
+        self._segments[key] = segment
+
+    def _save_cursors(self):
+        tmp = self.cursor_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({key: value.decode() for key, value in self._cursors.items() if value}, f)
+        os.replace(tmp, self.cursor_path)
+
+    def _enforce_retention(self, ns_name: str):
+        """Delete the oldest segments of a tenant until it is within its size budget"""
+        segments = []
+        for path in self._segment_paths(ns_name):
+            index = read_index(path) or {}
+            size = os.path.getsize(path) + (os.path.getsize(index_path(path)) if os.path.exists(index_path(path)) else 0)
+            segments.append((index.get("to", 0), path, size))
+        total = sum(size for _, _, size in segments)
+        for _, path, size in sorted(segments):
+            if total <= self.tenant_max_bytes:
+                break
+            for stale in (path, index_path(path)):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            self._segments = {key: seg for key, seg in self._segments.items() if seg.path != path}
+            total -= size
+        # Leave no empty deployment directories behind
+        for deployment in self.deployments(ns_name):
+            directory = self._directory(ns_name, deployment)
+            if os.path.isdir(directory) and not os.listdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def delete_namespace(self, ns_name: str):
+        with self._round_lock:
+            shutil.rmtree(os.path.join(self.root, ns_name), ignore_errors=True)
+            self._segments = {key: seg for key, seg in self._segments.items() if key[0] != ns_name}
+
+    # ---------- search ----------
+
+    def search(self, ns_name: str, deployment: Optional[str], query: str, since: Optional[float] = None,
+               until: Optional[float] = None, pod: Optional[str] = None, limit: int = 500) -> dict:
+        """Lines containing every token of the query (case-insensitive, whole words), newest last.
+
+        Returns the newest `limit` matches within [since, until] plus how many segments the
+        index let us skip.
+        """
+        if deployment is not None and not _SAFE_NAME_RE.match(deployment):
+            return {"matches": [], "segments_total": 0, "segments_scanned": 0, "truncated": False}
+        tokens = tokenize(query.encode())
+        candidates = []
+        paths = self._segment_paths(ns_name, deployment)
+        for path in paths:
+            index = read_index(path)
+            if index is None:
+                continue
+            if since is not None and index["to"] < since:
+                continue
+            if until is not None and index["from"] > until:
+                continue
+            if pod is not None and pod not in index["pods"]:
+                continue
+            bloom = BloomFilter.decode(index["bloom"], index["bloom_bits"], index["bloom_hashes"])
+            if not all(bloom.might_contain(token) for token in tokens):
+                continue
+            candidates.append((index["to"], path))
+
+        matches = deque(maxlen=limit)
+        truncated = False
+        scanned = 0
+        # Newest segments first, stop once the newest `limit` matches are known
+        for _, path in sorted(candidates, reverse=True):
+            if len(matches) >= limit:
+                truncated = True
+                break
+            scanned += 1
+            found = self._scan(path, tokens, since, until, pod, limit)
+            for match in reversed(found):
+                if len(matches) >= limit:
+                    truncated = True
+                    break
+                matches.appendleft(match)
+
+        results = sorted(matches, key=lambda match: match["timestamp"])
+        return {"matches": results, "segments_total": len(paths), "segments_scanned": scanned,
+                "truncated": truncated}
+
+    def _scan(self, path: str, tokens: set, since, until, pod, limit) -> List[dict]:
+        found = deque(maxlen=limit)
+        try:
+            with gzip.open(path, "rb") as f:
+                for raw in f:
+                    line = raw.rstrip(b"\n")
+                    if tokens and not tokens <= tokenize(line):
+                        continue
+                    parts = line.split(b" ", 3)
+                    if len(parts) < 4:
+                        continue
+                    stamp, pod_name, container, message = parts
+                    if pod is not None and pod_name.decode() != pod:
+                        continue
+                    epoch = parse_log_timestamp(stamp)
+                    if (since is not None and epoch < since) or (until is not None and epoch > until):
+                        continue
+                    found.append({
+                        "timestamp": stamp.decode(),
+                        "pod": pod_name.decode(),
+                        "container": container.decode(),
+                        "line": message.decode("utf-8", "replace"),
+                    })
+        except (EOFError, OSError):
+            # The newest gzip member may still be being written: use what was readable
+            pass
+        return list(found)
+
+    def status(self) -> dict:
+        return {
+            "started": self.started,
+            "interval_seconds": self.interval,
+            "seconds_since_round": round(time.time() - self.last_round, 1) if self.last_round else None,
+            "tracked_containers": len(self._cursors),
+            "api_calls_last_round": self.last_round_calls,
+            "api_calls_total": self.total_calls,
+            "skipped_collects": self.skipped_collects,
+            "open_segments": len(self._segments),
+            "last_error": self.last_error,
+        }
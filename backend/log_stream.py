@@ -0,0 +1,168 @@
+"""
+Streaming of pod logs from the Kubernetes API to HTTP clients.
+
+The log response (`_preload_content=False`) is read in fixed-size chunks on its own thread
+and handed to the event loop through a bounded queue: a slow client pauses the reader
+instead of the backend buffering the log, so a followed pod costs constant memory.
+
+For a deployment the timestamped logs of all replicas are k-way merged by timestamp
+(merge_log_lines), holding at most one line per replica besides the bounded queues.
+"""
+import asyncio
+import heapq
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Dict
+
+LOG_CHUNK_BYTES = 16 * 1024
+LOG_QUEUE_CHUNKS = 16
+MAX_LOG_LINE_BYTES = 64 * 1024  # longer lines are split instead of buffered
+# In follow mode a replica that has been quiet this long no longer holds back the others
+MERGE_WATERMARK_SECONDS = 1.0
+
+_EOF = object()
+
+
+class ResponsePump:
+    """Copies a urllib3 response into an asyncio queue from a dedicated reader thread"""
+
+    def __init__(self, response, loop: asyncio.AbstractEventLoop,
+                 chunk_size: int = LOG_CHUNK_BYTES, max_chunks: int = LOG_QUEUE_CHUNKS, name: str = "log"):
+        self.response = response
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.queue = asyncio.Queue(maxsize=max_chunks)
+        self.error = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"log-pump-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stop reading; closing the response also unblocks a reader waiting on the socket"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        try:
+            self.response.close()
+        except Exception:
+            pass
+
+    def _put(self, item) -> bool:
+        # Blocks while the queue is full (back-pressure), but keeps checking for close()
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+        while True:
+            try:
+                future.result(timeout=1)
+                return True
+            except FutureTimeoutError:
+                if self._stopped.is_set():
+                    future.cancel()
+                    return False
+
+    def _run(self):
+        try:
+            for chunk in self.response.stream(self.chunk_size, decode_content=True):
+                if self._stopped.is_set() or not self._put(chunk):
+                    return
+        except Exception as e:
+            if not self._stopped.is_set():
+                self.error = e
+        finally:
+            try:
+                self.response.release_conn()
+            except Exception:
+                pass
+            if not self._stopped.is_set():
+                self._put(_EOF)
+
+    async def chunks(self):
+        """Yield the raw log chunks until the response ends (or the consumer goes away)"""
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is _EOF:
+                    return
+                yield item
+        finally:
+            self.close()
+
+
+async def log_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LOG_LINE_BYTES):
+    """Split a chunk stream into lines (without the newline)"""
+    partial = b""
+    async for chunk in chunks:
+        partial += chunk
+        *lines, partial = partial.split(b"\n")
+        for line in lines:
+            yield line
+        while len(partial) > max_line_bytes:
+            yield partial[:max_line_bytes]
+            partial = partial[max_line_bytes:]
+    if partial:
+        yield partial
+
+
+def timestamp_key(line: bytes) -> tuple:
+    """Sort key of a `timestamps=true` log line ("2024-01-15T10:00:00.12345Z msg").
+    RFC3339Nano drops trailing zeros, so the fraction is padded before comparing."""
+    stamp = line.split(b" ", 1)[0]
+    seconds, _, fraction = stamp.rstrip(b"Z").partition(b".")
+    return seconds, fraction.ljust(9, b"0")
+
+
+async def merge_log_lines(sources: Dict[str, AsyncIterator[bytes]], follow: bool = False,
+                          watermark_seconds: float = MERGE_WATERMARK_SECONDS):
+    """K-way merge of timestamped log lines, yielding (source name, line) in timestamp order.
+
+    A line is only emitted once every source has a line (or has ended) to compare it with.
+    When following, sources that stay quiet longer than the watermark are skipped until they
+    produce again, so one idle replica cannot stall the merged stream.
+    """
+    iterators = {name: source.__aiter__() for name, source in sources.items()}
+    pending = {name: asyncio.ensure_future(it.__anext__()) for name, it in iterators.items()}
+    stalled = set()
+    heap = []
+    sequence = 0
+
+    def collect():
+        nonlocal sequence
+        for name, future in list(pending.items()):
+            if not future.done():
+                continue
+            del pending[name]
+            stalled.discard(name)
+            try:
+                line = future.result()
+            except StopAsyncIteration:
+                continue
+            heapq.heappush(heap, (timestamp_key(line), sequence, name, line))
+            sequence += 1
+
+    try:
+        while pending or heap:
+            waiting = [future for name, future in pending.items() if name not in stalled]
+            if waiting:
+                _, not_done = await asyncio.wait(waiting, timeout=watermark_seconds if follow else None)
+                stalled.update(name for name, future in pending.items() if future in not_done)
+            elif not heap:
+                # Every source is quiet: wait for whichever speaks first
+                await asyncio.wait(list(pending.values()), return_when=asyncio.FIRST_COMPLETED)
+            collect()
+            if not heap:
+                continue
+            _, _, name, line = heapq.heappop(heap)
+            yield name, line
+            if name in iterators and name not in pending:
+                pending[name] = asyncio.ensure_future(iterators[name].__anext__())
+    finally:
+        for future in pending.values():
+            future.cancel()
+        for it in iterators.values():
+            if hasattr(it, "aclose"):
+                try:
+                    await it.aclose()
+                except Exception:
+                    pass
@@ -0,0 +1,236 @@
+"""
+Background sampler for metrics.k8s.io with an in-memory time series per pod.
+
+One cluster-wide PodMetrics list per interval feeds every tenant namespace. Each pod keeps
+fixed-size, array-backed ring buffers: the raw samples plus 1m / 5m / 1h averages, so the
+memory per pod is bounded no matter how long it runs.
+"""
+import logging
+import re
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kubernetes import client
+
+from k8s_cache import TENANT_NAMESPACE_PREFIX
+from quantity import bytes_to_mi, usage_columns
+
+logger = logging.getLogger(__name__)
+
+# (name, resolution in seconds, capacity) of the averaged tiers; raw samples cover the last hour
+DOWNSAMPLED_TIERS = [("1m", 60, 360), ("5m", 300, 288), ("1h", 3600, 168)]  # 6h, 24h, 7d
+RAW_RETENTION_SECONDS = 3600
+STALE_SERIES_SECONDS = 3600  # drop the series of pods that have been gone this long
+
+_WINDOW_RE = re.compile(r"^(\d+)([smhd]?)$")
+_WINDOW_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(value: str) -> int:
+    """Window of the history endpoint ("90", "15m", "6h", "7d") in seconds"""
+    match = _WINDOW_RE.match(value.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid window: {value!r}")
+    return int(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, cpu millicores, memory Mi) series; the oldest point is overwritten.
+    Arrays grow up to the capacity, so short-lived pods stay small."""
+
+    __slots__ = ("capacity", "timestamps", "cpu", "memory", "_head")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("I")
+        self.cpu = array("f")
+        self.memory = array("f")
+        self._head = 0  # next slot to overwrite once full
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, cpu: float, memory: float):
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(int(timestamp))
+            self.cpu.append(cpu)
+            self.memory.append(memory)
+            return
+        self.timestamps[self._head] = int(timestamp)
+        self.cpu[self._head] = cpu
+        self.memory[self._head] = memory
+        self._head = (self._head + 1) % self.capacity
+
+    def points(self, since: float = 0) -> List[Tuple[int, float, float]]:
+        """Points with timestamp >= since, oldest first"""
+        size = len(self.timestamps)
+        start = self._head if size == self.capacity else 0
+        result = []
+        for offset in range(size):
+            i = (start + offset) % size
+            if self.timestamps[i] >= since:
+                result.append((self.timestamps[i], self.cpu[i], self.memory[i]))
+        return result
+
+
+class Downsampler:
+    """Averages raw samples into fixed time buckets of one tier"""
+
+    __slots__ = ("resolution", "buffer", "_bucket", "_cpu_sum", "_memory_sum", "_count")
+
+    def __init__(self, resolution: int, capacity: int):
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity)
+        self._bucket = None
+        self._cpu_sum = 0.0
+        self._memory_sum = 0.0
+        self._count = 0
+
+    def add(self, timestamp: float, cpu: float, memory: float):
+        bucket = int(timestamp) - int(timestamp) % self.resolution
+        if bucket != self._bucket:
+            if self._count:
+                self.buffer.append(self._bucket, self._cpu_sum / self._count, self._memory_sum / self._count)
+            self._bucket, self._cpu_sum, self._memory_sum, self._count = bucket, 0.0, 0.0, 0
+        self._cpu_sum += cpu
+        self._memory_sum += memory
+        self._count += 1
+
+    def points(self, since: float = 0) -> List[Tuple[int, float, float]]:
+        points = self.buffer.points(since)
+        # The bucket still being filled, so the newest point is never a whole resolution old
+        if self._count and self._bucket >= since:
+            points.append((self._bucket, self._cpu_sum / self._count, self._memory_sum / self._count))
+        return points
+
+
+class PodSeries:
+    def __init__(self, interval: int):
+        self.raw = RingBuffer(max(1, RAW_RETENTION_SECONDS // interval))
+        self.interval = interval
+        self.tiers = {name: Downsampler(resolution, capacity) for name, resolution, capacity in DOWNSAMPLED_TIERS}
+        self.last_seen = 0.0
+
+    def add(self, timestamp: float, cpu: float, memory: float):
+        self.raw.append(timestamp, cpu, memory)
+        for tier in self.tiers.values():
+            tier.add(timestamp, cpu, memory)
+        self.last_seen = timestamp
+
+    def select(self, window: int) -> Tuple[int, List[Tuple[int, float, float]]]:
+        """(resolution, points) from the finest tier that covers the window"""
+        since = time.time() - window
+        if window <= RAW_RETENTION_SECONDS:
+            return self.interval, self.raw.points(since)
+        for name, resolution, capacity in DOWNSAMPLED_TIERS:
+            if window <= resolution * capacity:
+                return resolution, self.tiers[name].points(since)
+        name, resolution, _ = DOWNSAMPLED_TIERS[-1]
+        return resolution, self.tiers[name].points(since)
+
+
+class MetricsSampler:
+    """Scrapes PodMetrics for all tenant namespaces every interval and keeps the latest sample
+    plus the per-pod history in memory"""
+
+    def __init__(self, list_func: Callable[[], dict], interval: int = 15,
+                 namespace_prefix: str = TENANT_NAMESPACE_PREFIX):
+        self.list_func = list_func
+        self.interval = interval
+        self.namespace_prefix = namespace_prefix
+        self.started = False
+        self.last_sample = None
+        self.last_error = None
+        self.samples = 0
+        self._latest: Dict[str, Dict[str, dict]] = {}
+        self._series: Dict[Tuple[str, str], PodSeries] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = True
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.time()
+            try:
+                self.sample()
+                self.last_error = None
+            except client.exceptions.ApiException as e:
+                self._report_error(f"{e.status} {e.reason}")
+            except Exception as e:
+                self._report_error(str(e))
+            self._stopped.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def _report_error(self, error: str):
+        # metrics-server being absent would otherwise log the same line every interval
+        if error != self.last_error:
+            logger.warning("Sampling failed: %s", error)
+        self.last_error = error
+
+    def sample(self):
+        now = time.time()
+        items = [
+            item for item in self.list_func().get("items", [])
+            if (item.get("metadata", {}).get("namespace") or "").startswith(self.namespace_prefix)
+        ]
+        latest: Dict[str, Dict[str, dict]] = {}
+        for item in items:
+            metadata = item["metadata"]
+            latest.setdefault(metadata["namespace"], {})[metadata["name"]] = item
+        usage = usage_columns(items).per_pod()
+
+        with self._lock:
+            self._latest = latest
+            self.last_sample = now
+            self.samples += 1
+            for key, (cpu_nano, memory_bytes) in usage.items():
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = PodSeries(self.interval)
+                series.add(now, cpu_nano / 1000000, bytes_to_mi(memory_bytes))
+            stale = [key for key, series in self._series.items() if now - series.last_seen > STALE_SERIES_SECONDS]
+            for key in stale:
+                del self._series[key]
+
+    def is_fresh(self) -> bool:
+        """Whether the latest sample is recent enough to answer requests with"""
+        return self.last_sample is not None and time.time() - self.last_sample <= 3 * self.interval
+
+    def latest_namespace(self, namespace: str) -> Optional[dict]:
+        """The latest PodMetricsList of a namespace ({"items": [...]}), or None without a fresh sample"""
+        if not self.is_fresh():
+            return None
+        return {"items": list(self._latest.get(namespace, {}).values())}
+
+    def latest_pod(self, namespace: str, pod: str) -> Optional[dict]:
+        """The latest PodMetrics of one pod, or None (not fresh, or not scraped yet)"""
+        if not self.is_fresh():
+            return None
+        return self._latest.get(namespace, {}).get(pod)
+
+    def history(self, namespace: str, pod: str, window: int) -> Tuple[int, List[Tuple[int, float, float]]]:
+        """(resolution seconds, [(timestamp, cpu millicores, memory Mi)]) covering the last window seconds"""
+        with self._lock:
+            series = self._series.get((namespace, pod))
+            if series is None:
+                return self.interval, []
+            return series.select(window)
+
+    def status(self) -> dict:
+        return {
+            "started": self.started,
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "seconds_since_sample": round(time.time() - self.last_sample, 1) if self.last_sample else None,
+            "series": len(self._series),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,91 @@
+"""
+Argon2 password hashing on a dedicated, bounded process pool.
+
+Hashing and verifying are CPU-bound (and deliberately slow). Running them in the request
+threadpool lets a burst of logins starve every cheap endpoint, so they go to their own
+worker processes instead. The number of queued + running operations is capped: when the
+pool is saturated callers get PasswordPoolSaturated right away (the API answers 429).
+
+This module is imported by the spawned workers, so it must not import main.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+from prometheus_client import Gauge, Histogram
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time to hash or verify a password, including the wait for a pool worker",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_PENDING = Gauge("password_hash_pending", "Password operations queued or running on the pool")
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """Async front-end of the hashing pool; pending is only touched from the event loop"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs threads (watches, samplers) is not safe
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _run(self, operation: str, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+        self.pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+            PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def status(self) -> dict:
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending,
+                "rejected": self.rejected}
+
+
+def default_workers() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
@@ -0,0 +1,69 @@
+"""
+Bounded LRU + TTL cache of authenticated principals, keyed by the token subject (username).
+
+get_current_user only needs a handful of User columns; caching them means an authenticated
+poll costs a JWT decode and a dict lookup instead of a database round trip. Entries expire
+after the TTL, and the endpoints that delete users invalidate them explicitly.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+
+class Principal(NamedTuple):
+    """The User fields the endpoints use; read-only and safe to share between requests"""
+    id: int
+    username: str
+    company_name: str
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, username=user.username, company_name=user.company_name, is_admin=bool(user.is_admin))
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # subject -> (expires_at, Principal)
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, subject: str, principal: Principal):
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def invalidate_where(self, predicate: Callable[[Principal], bool]):
+        with self._lock:
+            for subject in [s for s, (_, principal) in self._entries.items() if predicate(principal)]:
+                del self._entries[subject]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "maxsize": self.maxsize, "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,220 @@
+"""
+On-demand profiling of the running backend, without a redeploy.
+
+SamplingProfiler walks the stack of every thread (sys._current_frames) at a fixed interval
+from a background thread and counts the stacks in collapsed format ("a;b;c 42" per line),
+which flamegraph.pl, speedscope and inferno read directly. Sampling costs a few microseconds
+per thread per tick and nothing while no profile is running.
+
+RouteCapture profiles the next N requests to one route template: sampling is only enabled
+while at least one of those requests is in flight (other work on the same threads in that
+window is included too, so profile a quiet moment or look for the route's own frames).
+
+MemoryTracer wraps tracemalloc: start tracing, take numbered snapshots and diff two of them
+to see which lines allocated the memory that stayed (e.g. deserializing big list responses).
+"""
+import asyncio
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks = Counter()
+        self._enabled = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, enabled: bool = True):
+        if enabled:
+            self._enabled.set()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._enabled.set()  # wake the thread up
+        if self._thread is not None:
+            self._thread.join()
+
+    def pause(self):
+        self._enabled.clear()
+
+    def resume(self):
+        self._enabled.set()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.is_set():
+            self._enabled.wait()
+            if self._stopped.wait(self.interval):
+                break
+            if self._enabled.is_set():
+                self._sample(own)
+
+    def _sample(self, own: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RouteCapture:
+    """Profile of the next `requests` requests to `route` (only touched from the event loop)"""
+
+    def __init__(self, route: str, requests: int, interval: float):
+        self.route = route
+        self.remaining = requests
+        self.completed = 0
+        self.in_flight = 0
+        self.profiler = SamplingProfiler(interval)
+        self.done = asyncio.Event()
+
+    def claim(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        self.in_flight += 1
+        self.profiler.resume()
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self.completed += 1
+        if self.in_flight == 0:
+            self.profiler.pause()
+            if self.remaining == 0:
+                self.done.set()
+
+
+class ProfilerControl:
+    """Runs at most one profile at a time; the middleware consults it for route captures"""
+
+    def __init__(self):
+        self.busy = False
+        self.route_capture: Optional[RouteCapture] = None
+
+    def _acquire(self):
+        if self.busy:
+            raise ProfilerBusy()
+        self.busy = True
+
+    async def profile_for(self, seconds: float, interval: float) -> SamplingProfiler:
+        self._acquire()
+        profiler = SamplingProfiler(interval)
+        try:
+            profiler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+            self.busy = False
+        return profiler
+
+    async def profile_route(self, route: str, requests: int, timeout: float, interval: float) -> RouteCapture:
+        """Waits until `requests` matching requests finished, or `timeout` seconds passed"""
+        self._acquire()
+        capture = RouteCapture(route, requests, interval)
+        capture.profiler.start(enabled=False)
+        self.route_capture = capture
+        try:
+            await asyncio.wait_for(capture.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.route_capture = None
+            capture.profiler.stop()
+            self.busy = False
+        return capture
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, control: ProfilerControl, route_of):
+        self.app = app
+        self.control = control
+        self.route_of = route_of  # scope -> route template
+
+    async def __call__(self, scope, receive, send):
+        capture = self.control.route_capture
+        if capture is None or scope["type"] != "http" or self.route_of(scope) != capture.route or not capture.claim():
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            capture.release()
+
+
+class MemoryTracer:
+    """tracemalloc start/stop with numbered snapshots (the last `keep` are kept)"""
+
+    def __init__(self, keep: int = 5):
+        self.keep = keep
+        self.snapshots = {}
+        self._next_id = 1
+
+    def start(self, frames: int = 25):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self) -> int:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = snapshot
+        for old in sorted(self.snapshots)[:-self.keep]:
+            del self.snapshots[old]
+        return snapshot_id
+
+    def _get(self, snapshot_id: int):
+        if snapshot_id not in self.snapshots:
+            raise KeyError(snapshot_id)
+        return self.snapshots[snapshot_id]
+
+    def top(self, snapshot_id: int, group_by: str = "lineno", limit: int = 20) -> list:
+        return [{"size": stat.size, "count": stat.count, "traceback": stat.traceback.format()}
+                for stat in self._get(snapshot_id).statistics(group_by)[:limit]]
+
+    def diff(self, base_id: int, target_id: int, group_by: str = "lineno", limit: int = 20) -> list:
+        stats = self._get(target_id).compare_to(self._get(base_id), group_by)
+        return [{"size_diff": stat.size_diff, "size": stat.size, "count_diff": stat.count_diff, "count": stat.count,
+                 "traceback": stat.traceback.format()} for stat in stats[:limit]]
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {"tracing": tracemalloc.is_tracing(), "traced_bytes": current, "peak_bytes": peak,
+                "snapshots": sorted(self.snapshots)}
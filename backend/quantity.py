@@ -0,0 +1,138 @@
+"""
+Kubernetes resource quantity parsing ("100m", "1.5Gi", "2", "500k", "1e3", "8Ei", ...).
+
+Parsing is exact (integers / Fractions, no float rounding until the caller asks for it).
+The common "<integer><suffix>" shape takes a precompiled regex fast path with plain int
+arithmetic; everything else goes through the full grammar.
+"""
+import re
+from array import array
+from fractions import Fraction
+from functools import lru_cache
+
+KIB = 1024
+MIB = 1024 ** 2
+GIB = 1024 ** 3
+
+_BINARY_SUFFIXES = {"Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50, "Ei": 2 ** 60}
+_DECIMAL_EXPONENTS = {"n": -9, "u": -6, "m": -3, "": 0, "k": 3, "M": 6, "G": 9, "T": 12, "P": 15, "E": 18}
+
+# Exponent notation must be tried before the bare "E" (exa) suffix
+_QUANTITY_RE = re.compile(
+    r"^([+-]?(?:\d+(?:\.\d*)?|\.\d+))([eE][+-]?\d+|Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E)?$"
+)
+_INTEGER_RE = re.compile(r"^(\d+)(Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E)?$")
+
+# Fast-path multipliers, in the unit each parser returns
+_NANOCORE_MULTIPLIERS = {suffix: 10 ** (exp + 9) for suffix, exp in _DECIMAL_EXPONENTS.items() if exp + 9 >= 0}
+_NANOCORE_MULTIPLIERS.update({suffix: factor * 10 ** 9 for suffix, factor in _BINARY_SUFFIXES.items()})
+_BYTE_MULTIPLIERS = {suffix: 10 ** exp for suffix, exp in _DECIMAL_EXPONENTS.items() if exp >= 0}
+_BYTE_MULTIPLIERS.update(_BINARY_SUFFIXES)
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+@lru_cache(maxsize=4096)
+def parse_quantity(value: str) -> Fraction:
+    """Exact value of a quantity in base units (cores, bytes). Raises ValueError when invalid."""
+    match = _QUANTITY_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"invalid quantity: {value!r}")
+    number, suffix = match.group(1), match.group(2) or ""
+    amount = Fraction(number)
+    if suffix in _BINARY_SUFFIXES:
+        return amount * _BINARY_SUFFIXES[suffix]
+    if suffix in _DECIMAL_EXPONENTS:
+        exponent = _DECIMAL_EXPONENTS[suffix]
+    else:
+        exponent = int(suffix[1:])
+    return amount * Fraction(10) ** exponent
+
+
+def _ceil(value: Fraction) -> int:
+    # Kubernetes rounds fractional quantities up to the next whole unit
+    return -(-value.numerator // value.denominator)
+
+
+def parse_cpu_nanocores(value) -> int:
+    """CPU quantity as integer nanocores ("250m" -> 250000000, "1.5" -> 1500000000)"""
+    value = str(value)
+    match = _INTEGER_RE.match(value)
+    if match and (match.group(2) or "") in _NANOCORE_MULTIPLIERS:
+        return int(match.group(1)) * _NANOCORE_MULTIPLIERS[match.group(2) or ""]
+    return _ceil(parse_quantity(value) * 10 ** 9)
+
+
+def parse_bytes(value) -> int:
+    """Memory/storage quantity as integer bytes ("1.5Gi" -> 1610612736, "500k" -> 500000)"""
+    value = str(value)
+    match = _INTEGER_RE.match(value)
+    if match and (match.group(2) or "") in _BYTE_MULTIPLIERS:
+        return int(match.group(1)) * _BYTE_MULTIPLIERS[match.group(2) or ""]
+    return _ceil(parse_quantity(value))
+
+
+def cpu_millicores(value) -> float:
+    return parse_cpu_nanocores(value) / 1_000_000
+
+
+def bytes_to_mi(value: int) -> float:
+    return value / MIB
+
+
+def bytes_to_gi(value: int) -> float:
+    return value / GIB
+
+
+class UsageColumns:
+    """Container usage of a metrics.k8s.io PodMetrics list as parallel (columnar) arrays"""
+
+    __slots__ = ("namespaces", "pods", "cpu_nanocores", "memory_bytes")
+
+    def __init__(self):
+        self.namespaces = []
+        self.pods = []
+        self.cpu_nanocores = array("q")
+        self.memory_bytes = array("q")
+
+    def __len__(self):
+        return len(self.pods)
+
+    def total_cpu_nanocores(self) -> int:
+        return sum(self.cpu_nanocores)
+
+    def total_memory_bytes(self) -> int:
+        return sum(self.memory_bytes)
+
+    def per_pod(self) -> dict:
+        """{(namespace, pod): (cpu_nanocores, memory_bytes)} summed over containers, in one pass"""
+        totals = {}
+        for key, cpu, memory in zip(zip(self.namespaces, self.pods), self.cpu_nanocores, self.memory_bytes):
+            previous = totals.get(key)
+            totals[key] = (cpu, memory) if previous is None else (previous[0] + cpu, previous[1] + memory)
+        return totals
+
+
+def usage_columns(items) -> UsageColumns:
+    """Parse every container's usage of a PodMetrics list (dicts) into UsageColumns.
+    Unparseable values count as 0 instead of dropping the container."""
+    columns = UsageColumns()
+    for item in items or ():
+        metadata = item.get("metadata", {})
+        namespace = metadata.get("namespace")
+        pod = metadata.get("name")
+        for container in item.get("containers", ()):
+            usage = container.get("usage", {})
+            try:
+                cpu = parse_cpu_nanocores(usage.get("cpu", "0"))
+            except ValueError:
+                cpu = 0
+            try:
+                memory = parse_bytes(usage.get("memory", "0"))
+            except ValueError:
+                memory = 0
+            columns.namespaces.append(namespace)
+            columns.pods.append(pod)
+            columns.cpu_nanocores.append(min(cpu, _INT64_MAX))
+            columns.memory_bytes.append(min(memory, _INT64_MAX))
+    return columns
@@ -0,0 +1,200 @@
+"""
+Structured, non-blocking logging for the backend.
+
+Request handlers only put records on a bounded queue (QueueHandler); a listener thread
+formats them (JSON lines by default) and writes them to stdout, so slow stdout never stalls
+a request. When the queue is full records are dropped and counted instead of blocking.
+
+Every record carries the request id and route template of the request that logged it
+(RequestContextMiddleware sets them in context variables; the id comes from an incoming
+X-Request-ID or is generated, and is returned in the response header). Chatty debug lines
+can be sampled per route: with LOG_DEBUG_SAMPLING="/pods=0.01" only one in a hundred /pods
+requests logs its debug lines - all of them, so a sampled request stays readable.
+
+Bearer tokens never reach a log: RequestContextMiddleware takes ?access_token= out of the
+query string (for EventSource routes, which cannot send headers, it becomes the Authorization
+header), so the access log only sees the redacted URL, and the access log is filtered too.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+route_var: ContextVar[Optional[str]] = ContextVar("route", default=None)
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=True)
+
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+QUERY_TOKEN_PARAM = "access_token"
+_QUERY_TOKEN_RE = re.compile(r"(?<=[?&]access_token=)[^&\s\"]*")
+REDACTED = "[redacted]"
+
+# Attributes every LogRecord has; anything else came in through extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "route"}
+
+
+def parse_sampling(spec: str) -> dict:
+    """"/pods=0.01,/monitoring=0.1" -> {"/pods": 0.01, "/monitoring": 0.1}"""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        route, _, rate = part.rpartition("=")
+        rates[route.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def redact_query(text: str) -> str:
+    """Mask the value of access_token= query parameters in a URL or log line"""
+    return _QUERY_TOKEN_RE.sub(REDACTED, text) if QUERY_TOKEN_PARAM in text else text
+
+
+class RedactQueryTokenFilter(logging.Filter):
+    """For the access log, whose records carry the request path in their args"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact_query(arg) if isinstance(arg, str) else arg for arg in record.args)
+        if isinstance(record.msg, str):
+            record.msg = redact_query(record.msg)
+        return True
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request context and drops debug lines of unsampled requests.
+    Runs in the thread that logs, before the record is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and not debug_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the cheap part here: merge the args and render a traceback (frames must not
+        # outlive the call); JSON formatting happens on the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+            entry["route"] = record.route
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000, stream=None):
+    """Route the root logger through a bounded queue; returns (handler, listener). Stop the
+    listener on shutdown to flush what is still queued."""
+    log_queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    logging.getLogger("uvicorn.access").addFilter(RedactQueryTokenFilter())
+    listener.start()
+    return handler, listener
+
+
+class RequestContextMiddleware:
+    """Sets the request id / route / debug-sampling context for everything a request logs"""
+
+    def __init__(self, app, route_of, debug_sampling: Optional[dict] = None, debug_enabled: bool = False,
+                 query_token_paths: Iterable[str] = ()):
+        self.app = app
+        self.route_of = route_of  # scope -> route template
+        self.debug_sampling = debug_sampling or {}
+        self.debug_enabled = debug_enabled
+        self.query_token_paths = set(query_token_paths)  # where ?access_token= may authenticate
+
+    def _move_query_token(self, scope):
+        """Strip access_token from the query string, in place so the server's access log sees
+        the stripped URL too; on query_token_paths it becomes the Authorization header"""
+        query = scope.get("query_string") or b""
+        if QUERY_TOKEN_PARAM.encode() not in query:
+            return
+        params = parse_qsl(query.decode("latin-1"), keep_blank_values=True)
+        tokens = [value for key, value in params if key == QUERY_TOKEN_PARAM]
+        scope["query_string"] = urlencode([(k, v) for k, v in params if k != QUERY_TOKEN_PARAM]).encode("latin-1")
+        headers = list(scope.get("headers") or ())
+        if tokens and tokens[-1] and scope.get("path") in self.query_token_paths \
+                and not any(name == b"authorization" for name, _ in headers):
+            scope["headers"] = headers + [(b"authorization", f"Bearer {tokens[-1]}".encode("latin-1"))]
+
+    def _sampled(self, route: Optional[str]) -> bool:
+        rate = self.debug_sampling.get(route, self.debug_sampling.get("*", 1.0))
+        return rate >= 1.0 or random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self._move_query_token(scope)
+        incoming = dict(scope.get("headers") or ()).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        route = self.route_of(scope)
+        sampled = self._sampled(route) if self.debug_enabled else True
+        tokens = (request_id_var.set(request_id), route_var.set(route), debug_sampled_var.set(sampled))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            for var, token in zip((request_id_var, route_var, debug_sampled_var), tokens):
+                var.reset(token)
@@ -0,0 +1,188 @@
+"""
+End-to-end smoke test: the backend against benchmarks.fake_apiserver, configured through a
+kubeconfig exactly like a deployment outside the cluster, with the cluster cache running.
+"""
+import importlib
+import re
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("kubernetes")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from kubernetes.config import kube_config  # noqa: E402
+
+from benchmarks.fake_apiserver import PODS, RESOURCES, FakeApiServer  # noqa: E402
+
+NAMESPACE = "org-acme"
+DEPLOYMENTS, REPLICAS = 3, 2
+
+
+def wait_for(check, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.1)
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("backend")
+    server = FakeApiServer().start()
+    server.cluster.seed_tenant(NAMESPACE, "alice", DEPLOYMENTS, REPLICAS)
+    kubeconfig = str(workdir / "kubeconfig")
+    server.write_kubeconfig(kubeconfig)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("KUBERNETES_SERVICE_HOST", raising=False)  # never the in-cluster config
+        mp.setenv("KUBECONFIG", kubeconfig)
+        # The client reads KUBECONFIG when it is imported, which may have happened already
+        mp.setattr(kube_config, "KUBE_CONFIG_DEFAULT_LOCATION", kubeconfig)
+        mp.setenv("DATABASE_URL", f"sqlite:///{workdir / 'users.db'}")
+        mp.setenv("LOG_ARCHIVE_ENABLED", "false")
+        mp.setenv("METRICS_SAMPLER_ENABLED", "false")
+        mp.setenv("CLUSTER_CACHE_ENABLED", "true")
+        mp.setenv("LOG_FORMAT", "text")
+        sys.modules.pop("main", None)
+        main = importlib.import_module("main")
+
+        with TestClient(main.app) as client:
+            assert main.cluster_cache.wait_for_sync(10)
+            response = client.post("/register", json={"username": "alice", "password": "secret", "company_name": "acme"})
+            assert response.status_code == 200, response.text
+            token = client.post("/token", data={"username": "alice", "password": "secret"}).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+            yield client, server
+    server.stop()
+    sys.modules.pop("main", None)
+
+
+def pod_names(response) -> set:
+    return {pod["name"] for pod in response.json()}
+
+
+def test_pods_lists_the_tenant_pods_from_the_cache(backend):
+    client, _ = backend
+    response = client.get("/pods")
+    assert response.status_code == 200
+    assert len(response.json()) == DEPLOYMENTS * REPLICAS
+    assert all(pod["status"] == "Running" for pod in response.json())
+    assert response.headers["X-Cursor"]
+    assert int(response.headers["X-K8s-Calls"]) >= 0
+
+
+def test_pods_etag_gives_304(backend):
+    client, _ = backend
+    response = client.get("/pods")
+    etag = response.headers["ETag"]
+    revalidated = client.get("/pods", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_pods_since_reports_a_replaced_pod(backend):
+    client, server = backend
+    full = client.get("/pods")
+    cursor = full.headers["X-Cursor"]
+    victim = sorted(pod_names(full))[0]
+
+    server.cluster.delete(PODS, NAMESPACE, victim)  # the ReplicaSet replaces it
+
+    def delta():
+        body = client.get("/pods", params={"since": cursor}).json()
+        return body if victim in body["deleted"] and body["items"] else None
+
+    body = wait_for(delta)
+    assert body is not None, "the cache never reported the deleted pod"
+    assert body["full"] is False
+    assert victim not in {pod["name"] for pod in body["items"]}
+    assert pod_names(client.get("/pods")) == (pod_names(full) - {victim}) | {pod["name"] for pod in body["items"]}
+
+
+def test_pods_since_with_unknown_cursor_is_a_full_snapshot(backend):
+    client, _ = backend
+    body = client.get("/pods", params={"since": "unknown.1"}).json()
+    assert body["full"] is True
+    assert len(body["items"]) == DEPLOYMENTS * REPLICAS
+
+
+def test_paged_pods_reject_post_filters(backend):
+    client, _ = backend
+    assert client.get("/pods", params={"limit": 2, "status": "Running"}).status_code == 400
+    first = client.get("/pods", params={"limit": 4})
+    assert len(first.json()) == 4
+    rest = client.get("/pods", params={"limit": 4, "continue": first.headers["X-Continue"]})
+    assert pod_names(first) | pod_names(rest) == pod_names(client.get("/pods"))
+    assert "X-Continue" not in rest.headers
+
+
+def test_monitoring(backend):
+    client, _ = backend
+    response = client.get("/monitoring")
+    assert response.status_code == 200
+    assert re.search(r"[1-9]\d* bytes", response.headers["Server-Timing"])  # the metrics.k8s.io read is counted
+    data = response.json()
+    assert data["summary"]["total_pods"] == DEPLOYMENTS * REPLICAS
+    assert data["summary"]["total_deployments"] == DEPLOYMENTS
+    assert {pod["name"] for pod in data["pods"]} == pod_names(client.get("/pods"))
+
+    delta = client.get("/monitoring", params={"since": response.headers["X-Cursor"]}).json()
+    assert delta["full"] is False
+    assert delta["summary"]["total_pods"] == DEPLOYMENTS * REPLICAS
+
+
+def test_backups_status_filter(backend):
+    client, server = backend
+    pod = sorted(pod_names(client.get("/pods")))[0]
+    deployment = pod.rsplit("-", 2)[0]  # <deployment>-<replicaset hash>-<suffix>
+    jobs = RESOURCES[("/apis/batch/v1", "jobs")]
+    for name, status in (("done", {"succeeded": 1}), ("broken", {"failed": 1}), ("busy", {"active": 1})):
+        server.cluster.create(jobs, NAMESPACE, {
+            "metadata": {"name": f"{deployment}-backup-{name}", "labels": {"backup-for": deployment}},
+            "status": status,
+        })
+
+    def backups(**params):
+        return client.get(f"/pods/{pod}/backups", params=params).json()["backups"]
+
+    listed = wait_for(lambda: len(backups()) == 3 and backups())
+    assert listed, "the cache never saw the backup jobs"
+    assert sorted(b["status"] for b in listed) == ["Completed", "Failed", "Running"]
+    assert [b["name"] for b in backups(status="Failed")] == [f"{deployment}-backup-broken"]
+    assert [b["name"] for b in backups(status="Running")] == [f"{deployment}-backup-busy"]
+
+
+def test_deleted_company_users_stop_authenticating(backend, monkeypatch):
+    client, _ = backend
+    main = sys.modules["main"]
+
+    def login(username: str, password: str) -> dict:
+        token = client.post("/token", data={"username": username, "password": password}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    client.post("/register", json={"username": "bob", "password": "secret", "company_name": "globex"})
+    bob = login("bob", "secret")
+    assert client.get("/pods", headers=bob).status_code == 200  # bob's principal is cached now
+
+    committed = []
+    invalidate = main.principal_cache.invalidate
+
+    def recording_invalidate(username):
+        # A request racing the delete must not find the user in the database any more
+        db = main.SessionLocal()
+        try:
+            committed.append(db.query(main.User).filter(main.User.username == username).first() is None)
+        finally:
+            db.close()
+        invalidate(username)
+
+    monkeypatch.setattr(main.principal_cache, "invalidate", recording_invalidate)
+    assert client.delete("/admin/companies/globex", headers=login("admin", "admin123")).status_code == 200
+    assert committed == [True]
+    assert client.get("/pods", headers=bob).status_code == 401
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("starlette")
+
+from instrumentation import K8sCallAccount, count_response_bytes, current_account  # noqa: E402
+
+
+class FakeRestClient:
+    def __init__(self, response):
+        self.response = response
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        return self.response
+
+
+class StreamedResponse:
+    headers = {"Content-Length": "42"}
+
+    @property
+    def data(self):
+        raise AssertionError("reading .data would consume the stream")
+
+
+@pytest.fixture
+def account():
+    account = K8sCallAccount()
+    token = current_account.set(account)
+    yield account
+    current_account.reset(token)
+
+
+def test_counts_preloaded_bodies_once_per_client(account):
+    rest_client = FakeRestClient(SimpleNamespace(data=b"x" * 100))
+    api_client = SimpleNamespace(rest_client=rest_client)
+    count_response_bytes(api_client, "CoreV1Api")
+    count_response_bytes(api_client, "CoreV1Api")  # a second API object on the same client
+    rest_client.request("GET", "/api/v1/pods")
+    assert (rest_client.requests, account.bytes) == (1, 100)
+
+
+def test_streamed_responses_use_content_length(account):
+    rest_client = FakeRestClient(StreamedResponse())
+    count_response_bytes(SimpleNamespace(rest_client=rest_client), "CoreV1Api")
+    rest_client.request("GET", "/api/v1/namespaces/a/pods/b/log", _preload_content=False)
+    assert account.bytes == 42
+
+
+def test_unread_bodies_use_content_length(account):
+    # Newer clients return the response before its body is read
+    rest_client = FakeRestClient(SimpleNamespace(data=None, headers={"Content-Length": "7"}))
+    count_response_bytes(SimpleNamespace(rest_client=rest_client), "CoreV1Api")
+    rest_client.request("GET", "/api/v1/pods")
+    assert account.bytes == 7
+
+
+def test_clients_without_a_rest_client_are_left_alone():
+    api_client = SimpleNamespace()
+    count_response_bytes(api_client, "CoreV1Api")
+    assert vars(api_client) == {}
+
+
+def test_wraps_a_real_api_client():
+    kubernetes = pytest.importorskip("kubernetes")
+    from instrumentation import InstrumentedApi
+
+    api = InstrumentedApi(kubernetes.client.CoreV1Api(kubernetes.client.ApiClient()))
+    assert api.api_client.rest_client._counts_response_bytes
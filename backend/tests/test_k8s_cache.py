@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("kubernetes")
+
+import k8s_cache  # noqa: E402
+from k8s_cache import ClusterCache, NamespaceEventHub, labels_match, parse_label_selector  # noqa: E402
+
+
+def obj(namespace: str, name: str, rv: str = "1", labels=None):
+    return SimpleNamespace(metadata=SimpleNamespace(namespace=namespace, name=name, resource_version=rv,
+                                                    labels=labels, owner_references=None))
+
+
+def listed(*items):
+    return SimpleNamespace(items=list(items), metadata=SimpleNamespace(resource_version="10"))
+
+
+@pytest.fixture
+def cache():
+    return ClusterCache({"pods": lambda **kwargs: listed(), "services": lambda **kwargs: listed()})
+
+
+def test_label_selectors():
+    requirements = parse_label_selector("app=web, tier!=db,owner,!legacy")
+    assert labels_match({"app": "web", "tier": "api", "owner": "alice"}, requirements)
+    assert not labels_match({"app": "web", "tier": "db", "owner": "alice"}, requirements)
+    assert not labels_match({"app": "web", "owner": "alice", "legacy": "1"}, requirements)
+    assert not labels_match({"app": "web"}, requirements)
+    assert labels_match(None, parse_label_selector(""))
+
+
+def test_changes_since_reports_the_last_event_per_object(cache):
+    cursor = cache.cursor()
+    cache._apply("pods", "ADDED", obj("org-a", "web"))
+    cache._apply("pods", "ADDED", obj("org-a", "db"))
+    cache._apply("pods", "DELETED", obj("org-a", "db"))
+    cache._apply("services", "ADDED", obj("org-a", "web-svc"))
+    cache._apply("pods", "ADDED", obj("org-b", "other"))
+    assert cache.changes_since("org-a", cursor, ["pods", "services"]) == {
+        "pods": {"web": "ADDED", "db": "DELETED"},
+        "services": {"web-svc": "ADDED"},
+    }
+    assert cache.changes_since("org-a", cache.cursor(), ["pods"]) == {"pods": {}}
+
+
+def test_untracked_namespaces_are_ignored(cache):
+    cursor = cache.cursor()
+    cache._apply("pods", "ADDED", obj("kube-system", "coredns"))
+    assert cache.cursor() == cursor
+    assert cache.list("pods", "kube-system") == []
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage", "deadbeef.1", "x.y"])
+def test_unusable_cursors_mean_full_snapshot(cache, cursor):
+    cache._apply("pods", "ADDED", obj("org-a", "web"))
+    assert cache.changes_since("org-a", cursor, ["pods"]) is None
+
+
+def test_cursor_from_another_process_is_rejected(cache):
+    other = ClusterCache({"pods": lambda **kwargs: listed()})
+    assert cache.changes_since("org-a", other.cursor(), ["pods"]) is None
+
+
+def test_cursor_from_the_future_is_rejected(cache):
+    epoch, seq = cache.cursor().split(".")
+    assert cache.changes_since("org-a", f"{epoch}.{int(seq) + 5}", ["pods"]) is None
+
+
+def test_cursor_older_than_the_change_log(cache, monkeypatch):
+    monkeypatch.setattr(k8s_cache, "CHANGE_LOG_SIZE", 3)
+    cursor = cache.cursor()
+    for i in range(5):
+        cache._apply("pods", "ADDED", obj("org-a", f"pod-{i}"))
+    assert cache.changes_since("org-a", cursor, ["pods"]) is None
+    recent = cache.cursor()
+    cache._apply("pods", "MODIFIED", obj("org-a", "pod-4", rv="2"))
+    assert cache.changes_since("org-a", recent, ["pods"]) == {"pods": {"pod-4": "MODIFIED"}}
+
+
+def test_relist_records_what_the_watch_missed(cache):
+    cache._replace("pods", [obj("org-a", "kept"), obj("org-a", "changed"), obj("org-a", "gone")])
+    cursor = cache.cursor()
+    version = cache.namespace_version("org-a", ["pods"])
+    cache._replace("pods", [obj("org-a", "kept"), obj("org-a", "changed", rv="2"), obj("org-a", "new")])
+    assert cache.changes_since("org-a", cursor, ["pods"]) == {
+        "pods": {"changed": "MODIFIED", "gone": "DELETED", "new": "ADDED"}}
+    assert cache.namespace_version("org-a", ["pods"]) != version
+    assert cache.namespace_version("org-a", ["services"]) == cache.namespace_version("org-b", ["services"])
+
+
+def test_list_filters_by_label(cache):
+    cache._replace("pods", [obj("org-a", "web", labels={"app": "web"}), obj("org-a", "db", labels={"app": "db"})])
+    assert [p.metadata.name for p in cache.list("pods", "org-a", "app=web")] == ["web"]
+
+
+def test_reflector_stopped_while_listing_does_not_watch(monkeypatch):
+    streams = []
+
+    class FakeWatch:
+        def stream(self, *args, **kwargs):
+            streams.append(kwargs)
+            return iter(())
+
+        def stop(self):
+            pass
+
+    monkeypatch.setattr(k8s_cache.watch, "Watch", FakeWatch)
+    cache = ClusterCache({"pods": lambda **kwargs: None})
+    reflector = cache._reflectors["pods"]
+
+    def list_and_stop(**kwargs):
+        reflector.stop()
+        return listed()
+
+    reflector.list_func = list_and_stop
+    reflector._run()
+    assert reflector.synced.is_set()
+    assert streams == []
+
+
+def test_per_namespace_resync_only_reaches_that_namespace(monkeypatch):
+    monkeypatch.setattr(ClusterCache, "start", lambda self: setattr(self, "started", True))
+    shared = ClusterCache({"pods": lambda **kwargs: listed()})  # not started: per-namespace watchers
+
+    async def scenario():
+        hub = NamespaceEventHub("pods", shared, lambda **kwargs: listed())
+        loop = asyncio.get_running_loop()
+        a, b = hub.subscribe("org-a", loop), hub.subscribe("org-b", loop)
+        assert hub._watchers["org-a"]._reflectors["pods"].watch_timeout == k8s_cache.NAMESPACE_WATCH_TIMEOUT_SECONDS
+        hub._watchers["org-a"]._notify("pods", "RESYNC", None)
+        await asyncio.sleep(0)
+        assert (a.queue.qsize(), b.queue.qsize()) == (1, 0)
+        # A relist of the shared cache concerns everyone
+        shared._notify("pods", "RESYNC", None)
+        await asyncio.sleep(0)
+        assert (a.queue.qsize(), b.queue.qsize()) == (2, 1)
+        hub.unsubscribe(a)
+        hub.unsubscribe(b)
+        assert hub._watchers == {}
+
+    asyncio.run(scenario())
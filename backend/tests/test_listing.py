@@ -0,0 +1,56 @@
+import pytest
+
+from listing import InvalidListQuery, decode_continue, encode_continue, keyset_page, matches, parse_fields, project
+
+
+def test_continue_token_round_trip():
+    token = encode_continue("n", "nginx-1001")
+    assert decode_continue(token) == ["n", "nginx-1001"]
+
+
+@pytest.mark.parametrize("token", ["", "not base64!", "e30=", "W10="])
+def test_invalid_continue_tokens(token):
+    # "e30=" is {} and "W10=" is []: valid JSON, but not a token
+    with pytest.raises(InvalidListQuery):
+        decode_continue(token)
+
+
+def test_keyset_pages_cover_every_item_once():
+    items = [{"name": f"pod-{i:02d}"} for i in range(7)]
+    seen, after = [], None
+    while True:
+        page, after = keyset_page(items, 3, after)
+        seen.extend(item["name"] for item in page)
+        if after is None:
+            break
+    assert seen == [item["name"] for item in items]
+
+
+def test_keyset_page_survives_deleted_cursor_item():
+    items = [{"name": name} for name in ("a", "b", "d")]
+    page, next_key = keyset_page(items, 2, after="c")
+    assert page == [{"name": "d"}] and next_key is None
+
+
+def test_keyset_page_newest_first():
+    items = [{"name": name, "at": at} for name, at in (("c", 3), ("b", 2), ("a", 1))]
+    page, next_key = keyset_page(items, 2, key=lambda item: item["at"], reverse=True)
+    assert [item["name"] for item in page] == ["c", "b"] and next_key == 2
+    page, next_key = keyset_page(items, 2, after=next_key, key=lambda item: item["at"], reverse=True)
+    assert [item["name"] for item in page] == ["a"] and next_key is None
+
+
+def test_parse_fields():
+    assert parse_fields(None, ("name", "status")) is None
+    assert parse_fields("status", ("name", "status")) == ("name", "status")
+    assert parse_fields("status,status", ("name", "status")) == ("name", "status")
+    with pytest.raises(InvalidListQuery):
+        parse_fields("secret", ("name", "status"))
+
+
+def test_project_and_matches():
+    items = [{"name": "a", "status": "Running", "cost": 5}]
+    assert project(items, ("name", "cost")) == [{"name": "a", "cost": 5}]
+    assert project(items, None) is items
+    assert matches(items[0], {"status": "Running", "type": None})
+    assert not matches(items[0], {"status": "Pending"})
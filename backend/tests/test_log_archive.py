@@ -0,0 +1,107 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("kubernetes")
+
+from log_archive import BloomFilter, LogArchiver, Segment, archive_name, parse_log_timestamp, tokenize  # noqa: E402
+
+
+def make_pod(namespace: str, name: str, deployment: str, labels=None):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            namespace=namespace, name=name, labels={"pod-template-hash": "5d8f", **(labels or {})},
+            owner_references=[SimpleNamespace(controller=True, kind="ReplicaSet", name=f"{deployment}-5d8f")],
+        ),
+        status=SimpleNamespace(phase="Running"),
+        spec=SimpleNamespace(containers=[SimpleNamespace(name="app")]),
+    )
+
+
+def test_bloom_filter_has_no_false_negatives_and_round_trips():
+    bloom = BloomFilter()
+    tokens = [f"token{i}".encode() for i in range(500)]
+    for token in tokens:
+        bloom.add(token)
+    decoded = BloomFilter.decode(bloom.encode(), bloom.size, bloom.hashes)
+    assert all(decoded.might_contain(token) for token in tokens)
+    assert decoded.set_bits == bloom.set_bits
+    false_positives = sum(decoded.might_contain(f"other{i}".encode()) for i in range(1000))
+    assert false_positives < 50
+
+
+def test_archive_name_is_the_deployment():
+    assert archive_name(make_pod("org-a", "web-5d8f-x1", "web")) == "web"
+
+
+def test_parse_log_timestamp():
+    assert parse_log_timestamp(b"1970-01-01T00:01:00.250000000Z") == 60.25
+
+
+def test_segment_append_and_search(tmp_path):
+    archiver = LogArchiver(str(tmp_path), lambda namespace=None: [], None)
+    lines = [
+        (100.0, b"1970-01-01T00:01:40Z web-1 app GET /health 200", "web-1"),
+        (101.0, b"1970-01-01T00:01:41Z web-1 app ERROR database timeout", "web-1"),
+        (102.0, b"1970-01-01T00:01:42Z web-2 app error disk full", "web-2"),
+    ]
+    archiver._append(("org-a", "web"), lines)
+
+    result = archiver.search("org-a", "web", "error")
+    assert [m["line"] for m in result["matches"]] == ["ERROR database timeout", "error disk full"]
+    assert archiver.search("org-a", "web", "error", pod="web-2")["matches"][0]["pod"] == "web-2"
+    assert archiver.search("org-a", "web", "error", since=101.5)["matches"][0]["line"] == "error disk full"
+    # The bloom filter rules the segment out without decompressing it
+    missing = archiver.search("org-a", "web", "kubernetes")
+    assert missing["matches"] == [] and missing["segments_scanned"] == 0
+    assert archiver.search("org-a", "../etc", "error")["matches"] == []
+
+
+def test_segment_index_survives_reload(tmp_path):
+    segment = Segment.create(str(tmp_path), 100.0)
+    segment.append([(100.0, b"1970-01-01T00:01:40Z p c hello world", "p")])
+    loaded = Segment.load(segment.path)
+    assert loaded.index["lines"] == 1 and loaded.index["pods"] == ["p"]
+    assert all(loaded.bloom.might_contain(token) for token in tokenize(b"hello world"))
+    with gzip.open(segment.path) as f:
+        assert f.read().endswith(b"hello world\n")
+
+
+def test_collect_scoped_to_a_deployment(tmp_path):
+    pods = [make_pod("org-a", "web-5d8f-x1", "web"), make_pod("org-a", "db-5d8f-x1", "db"),
+            make_pod("org-b", "web-5d8f-y1", "web")]
+    reads = []
+
+    def read_log(name, namespace, **kwargs):
+        reads.append((namespace, name))
+        return SimpleNamespace(data=b"2024-01-15T10:00:00Z started\n")
+
+    archiver = LogArchiver(str(tmp_path), lambda namespace=None: [p for p in pods if namespace in (None, p.metadata.namespace)],
+                           read_log)
+    assert archiver.collect(namespace="org-a", deployments={"web"})
+    assert reads == [("org-a", "web-5d8f-x1")]
+    assert archiver.status()["api_calls_last_round"] == 0  # not a full round
+
+    reads.clear()
+    archiver.collect()
+    assert len(reads) == 3 and archiver.status()["api_calls_last_round"] == 3
+
+
+def test_collect_gives_up_while_a_round_runs(tmp_path):
+    archiver = LogArchiver(str(tmp_path), lambda namespace=None: [], None)
+    with archiver._round_lock:
+        assert archiver.collect(namespace="org-a", deployments={"web"}, timeout=0.01) is False
+    assert archiver.status()["skipped_collects"] == 1
+
+
+def test_label_selector_limits_archiving(tmp_path):
+    pods = [make_pod("org-a", "web-5d8f-x1", "web", {"log-archive": "true"}), make_pod("org-a", "db-5d8f-x1", "db")]
+    reads = []
+
+    def read_log(name, namespace, **kwargs):
+        reads.append(name)
+        return SimpleNamespace(data=b"")
+
+    LogArchiver(str(tmp_path), lambda namespace=None: pods, read_log, label_selector="log-archive=true").collect()
+    assert reads == ["web-5d8f-x1"]
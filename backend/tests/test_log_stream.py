@@ -0,0 +1,37 @@
+import asyncio
+
+from log_stream import log_lines, merge_log_lines, timestamp_key
+
+
+async def source(*lines: bytes):
+    for line in lines:
+        yield line
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def test_timestamp_key_pads_the_fraction():
+    # RFC3339Nano drops trailing zeros: .5 is later than .123
+    assert timestamp_key(b"2024-01-15T10:00:00.5Z a") > timestamp_key(b"2024-01-15T10:00:00.123Z b")
+    assert timestamp_key(b"2024-01-15T10:00:00Z a") < timestamp_key(b"2024-01-15T10:00:00.000000001Z b")
+
+
+def test_merge_orders_lines_of_all_replicas_by_timestamp():
+    merged = asyncio.run(collect(merge_log_lines({
+        "web-1": source(b"2024-01-15T10:00:00.1Z a1", b"2024-01-15T10:00:02Z a2"),
+        "web-2": source(b"2024-01-15T10:00:00.05Z b1", b"2024-01-15T10:00:01Z b2", b"2024-01-15T10:00:03Z b3"),
+    })))
+    assert [line.split(b" ")[1] for _, line in merged] == [b"b1", b"a1", b"b2", b"a2", b"b3"]
+    assert [name for name, _ in merged] == ["web-2", "web-1", "web-2", "web-1", "web-2"]
+
+
+def test_merge_with_an_empty_source():
+    merged = asyncio.run(collect(merge_log_lines({"a": source(), "b": source(b"2024-01-15T10:00:00Z x")})))
+    assert merged == [("b", b"2024-01-15T10:00:00Z x")]
+
+
+def test_log_lines_splits_chunks_and_long_lines():
+    lines = asyncio.run(collect(log_lines(source(b"one\ntw", b"o\n", b"x" * 10), max_line_bytes=4)))
+    assert lines == [b"one", b"two", b"xxxx", b"xxxx", b"xx"]
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("kubernetes")
+
+from metrics_history import Downsampler, RingBuffer, parse_window  # noqa: E402
+
+
+def test_ring_buffer_keeps_the_newest_points_in_order():
+    buffer = RingBuffer(3)
+    for t in range(5):
+        buffer.append(100 + t, float(t), float(t) * 2)
+    assert len(buffer) == 3
+    assert [point[0] for point in buffer.points()] == [102, 103, 104]
+    assert buffer.points(since=104) == [(104, 4.0, 8.0)]
+
+
+def test_ring_buffer_below_capacity():
+    buffer = RingBuffer(10)
+    buffer.append(1, 1.0, 1.0)
+    buffer.append(2, 2.0, 2.0)
+    assert [point[0] for point in buffer.points()] == [1, 2]
+
+
+def test_downsampler_averages_per_bucket():
+    tier = Downsampler(resolution=60, capacity=10)
+    for t, cpu in ((0, 10.0), (30, 20.0), (60, 40.0), (90, 60.0), (125, 5.0)):
+        tier.add(t, cpu, cpu * 2)
+    # Two complete buckets, plus the one still being filled
+    assert tier.points() == [(0, 15.0, 30.0), (60, 50.0, 100.0), (120, 5.0, 10.0)]
+    assert tier.points(since=60) == [(60, 50.0, 100.0), (120, 5.0, 10.0)]
+
+
+@pytest.mark.parametrize("value, seconds", [("90", 90), ("15m", 900), ("6h", 21600), ("7d", 604800)])
+def test_parse_window(value, seconds):
+    assert parse_window(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["0", "1w", "h", "-5m"])
+def test_parse_window_rejects(value):
+    with pytest.raises(ValueError):
+        parse_window(value)
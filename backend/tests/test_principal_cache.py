@@ -0,0 +1,45 @@
+import time
+
+from principal_cache import Principal, PrincipalCache
+
+
+def principal(name: str, company: str = "acme") -> Principal:
+    return Principal(id=1, username=name, company_name=company, is_admin=False)
+
+
+def test_hit_and_miss():
+    cache = PrincipalCache()
+    assert cache.get("alice") is None
+    cache.put("alice", principal("alice"))
+    assert cache.get("alice").username == "alice"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = PrincipalCache(ttl_seconds=60)
+    cache.put("alice", principal("alice"))
+    now[0] += 59
+    assert cache.get("alice") is not None
+    now[0] += 2
+    assert cache.get("alice") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = PrincipalCache(maxsize=2)
+    cache.put("a", principal("a"))
+    cache.put("b", principal("b"))
+    cache.get("a")
+    cache.put("c", principal("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_invalidate_where():
+    cache = PrincipalCache()
+    cache.put("a", principal("a", "acme"))
+    cache.put("b", principal("b", "globex"))
+    cache.invalidate_where(lambda p: p.company_name == "acme")
+    assert cache.get("a") is None and cache.get("b") is not None
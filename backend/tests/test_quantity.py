@@ -0,0 +1,60 @@
+import pytest
+
+from quantity import cpu_millicores, parse_bytes, parse_cpu_nanocores, parse_quantity, usage_columns
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("128974848", 128974848),
+    ("129e6", 129000000),
+    ("129M", 129000000),
+    ("123Mi", 123 * 1024 ** 2),
+    ("1.5Gi", 1610612736),
+    ("500k", 500000),
+    ("0.5", 1),  # fractional bytes round up
+    (1024, 1024),
+])
+def test_parse_bytes(value, expected):
+    assert parse_bytes(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("250m", 250_000_000),
+    ("1", 1_000_000_000),
+    ("1.5", 1_500_000_000),
+    ("12345n", 12345),
+    ("100u", 100_000),
+    ("1e-3", 1_000_000),
+])
+def test_parse_cpu_nanocores(value, expected):
+    assert parse_cpu_nanocores(value) == expected
+
+
+def test_cpu_millicores():
+    assert cpu_millicores("250m") == 250.0
+
+
+def test_fast_path_agrees_with_the_full_grammar():
+    for value in ("0", "7", "100m", "64Ki", "3G", "2Ei"):
+        assert parse_bytes(value) == -(-parse_quantity(value).numerator // parse_quantity(value).denominator)
+
+
+@pytest.mark.parametrize("value", ["", "abc", "1.2.3", "10Xi", "--1"])
+def test_invalid_quantities(value):
+    with pytest.raises(ValueError):
+        parse_quantity(value)
+
+
+def test_usage_columns_counts_bad_values_as_zero():
+    columns = usage_columns([
+        {"metadata": {"namespace": "org-a", "name": "web"}, "containers": [
+            {"usage": {"cpu": "100m", "memory": "64Mi"}},
+            {"usage": {"cpu": "bogus", "memory": "1Mi"}},
+        ]},
+        {"metadata": {"namespace": "org-a", "name": "db"}, "containers": [{"usage": {"cpu": "1", "memory": "1Gi"}}]},
+    ])
+    assert len(columns) == 3
+    assert columns.per_pod() == {
+        ("org-a", "web"): (100_000_000, 65 * 1024 ** 2),
+        ("org-a", "db"): (1_000_000_000, 1024 ** 3),
+    }
+    assert columns.total_cpu_nanocores() == 1_100_000_000
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import {
@@ -90,12 +90,13 @@ import {
   Stream as StreamingIcon,
 } from '@mui/icons-material';
 import { COLORS, STATUS_COLORS, ANIMATION_DURATION, useThemeContext } from './theme';
-import { usePolling, useNotification } from './hooks';
+import { usePolling, useEventStream, useNotification } from './hooks';
 import StatusBadge from './components/common/StatusBadge';
 import ResourceBar from './components/common/ResourceBar';
 import MainLayout from './components/layout/MainLayout';
 
 const API_BASE = 'http://192.168.154.114:30001';
+const MAX_FOLLOWED_LOG_CHARS = 200000;
 
 // ============================================
 // APPLICATION CATALOG - Rich deployment options
@@ -746,6 +747,7 @@ const PodDetailModal = ({
 }) => {
   const [activeTab, setActiveTab] = useState(0);
   const [logs, setLogs] = useState('');
+  const [followLogs, setFollowLogs] = useState(false);
   const [metrics, setMetrics] = useState(null);
   const [envVars, setEnvVars] = useState([]);
   const [storage, setStorage] = useState([]);
@@ -782,6 +784,41 @@ const PodDetailModal = ({
     setLoading(false);
   }, [pod, token]);
 
+  // Follow mode: read the chunked text/plain log stream, keeping only the tail in state
+  useEffect(() => {
+    if (!open || !pod || activeTab !== 1 || !followLogs) return undefined;
+    const controller = new AbortController();
+    const follow = async () => {
+      try {
+        const response = await fetch(`${API_BASE}/pods/${pod.name}/logs?follow=true&tail_lines=200`, {
+          headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal,
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        setLogs('');
+        for (;;) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          const text = decoder.decode(value, { stream: true });
+          setLogs((prev) => (prev + text).slice(-MAX_FOLLOWED_LOG_CHARS));
+        }
+        setFollowLogs(false);
+      } catch (err) {
+        if (err.name === 'AbortError') return;
+        setLogs((prev) => prev + '\nLog stream stopped: ' + err.message);
+        setFollowLogs(false);
+      }
+    };
+    follow();
+    return () => controller.abort();
+  }, [open, pod, activeTab, followLogs, token]);
+
+  useEffect(() => {
+    setFollowLogs(false);
+  }, [open, pod]);
+
   const fetchMetrics = useCallback(async () => {
     if (!pod) return;
     setLoading(true);
@@ -1022,14 +1059,23 @@ const PodDetailModal = ({
           >
             {logs || 'No logs available'}
           </Paper>
-          <Button
-            variant="outlined"
-            startIcon={<RefreshIcon />}
-            onClick={fetchLogs}
-            sx={{ mt: 2 }}
-          >
-            Refresh Logs
-          </Button>
+          <Box sx={{ display: 'flex', gap: 1, mt: 2 }}>
+            <Button
+              variant="outlined"
+              startIcon={<RefreshIcon />}
+              onClick={fetchLogs}
+              disabled={followLogs}
+            >
+              Refresh Logs
+            </Button>
+            <Button
+              variant={followLogs ? 'contained' : 'outlined'}
+              startIcon={followLogs ? <StopIcon /> : <StartIcon />}
+              onClick={() => setFollowLogs((prev) => !prev)}
+            >
+              {followLogs ? 'Stop Following' : 'Follow Logs'}
+            </Button>
+          </Box>
         </TabPanel>
 
         {/* Metrics Tab */}
@@ -2189,6 +2235,35 @@ export default function Dashboard() {
     navigate('/');
   }, [navigate]);
 
+  // Split the tenant's pods into regular and EUSUITE pods
+  const applyPods = useCallback((allPods) => {
+    const euPods = allPods.filter(p => 
+      p.name?.startsWith('eusuite-') || 
+      p.name?.startsWith('eumail-') || 
+      p.name?.startsWith('eucloud-') || 
+      p.name?.startsWith('eutype-') || 
+      p.name?.startsWith('eugroups-') || 
+      p.name?.startsWith('euadmin-')
+    );
+    const regularPods = allPods.filter(p => 
+      !p.name?.startsWith('eusuite-') && 
+      !p.name?.startsWith('eumail-') && 
+      !p.name?.startsWith('eucloud-') && 
+      !p.name?.startsWith('eutype-') && 
+      !p.name?.startsWith('eugroups-') && 
+      !p.name?.startsWith('euadmin-')
+    );
+    
+    console.log('[Dashboard] Regular pods:', regularPods.length);
+    console.log('[Dashboard] EUSUITE pods:', euPods.length);
+    
+    setPods(regularPods);
+    setEusuitePods(euPods);
+    setEusuiteDeployed(euPods.length > 0);
+    setError(null);
+    setLoading(false);
+  }, []);
+
   // Fetch pods with detailed logging
   const fetchPods = useCallback(async () => {
     if (!token) {
@@ -2214,32 +2289,7 @@ export default function Dashboard() {
       console.log('[Dashboard] Parsed pods array:', allPods);
       console.log('[Dashboard] Number of pods:', allPods.length);
       
-      // Separate EUSUITE pods
-      const euPods = allPods.filter(p => 
-        p.name?.startsWith('eusuite-') || 
-        p.name?.startsWith('eumail-') || 
-        p.name?.startsWith('eucloud-') || 
-        p.name?.startsWith('eutype-') || 
-        p.name?.startsWith('eugroups-') || 
-        p.name?.startsWith('euadmin-')
-      );
-      const regularPods = allPods.filter(p => 
-        !p.name?.startsWith('eusuite-') && 
-        !p.name?.startsWith('eumail-') && 
-        !p.name?.startsWith('eucloud-') && 
-        !p.name?.startsWith('eutype-') && 
-        !p.name?.startsWith('eugroups-') && 
-        !p.name?.startsWith('euadmin-')
-      );
-      
-      console.log('[Dashboard] Regular pods:', regularPods.length);
-      console.log('[Dashboard] EUSUITE pods:', euPods.length);
-      
-      setPods(regularPods);
-      setEusuitePods(euPods);
-      setEusuiteDeployed(euPods.length > 0);
-      setError(null);
-      setLoading(false);
+      applyPods(allPods);
     } catch (err) {
       console.error('[Dashboard] Error fetching pods:', err);
       console.error('[Dashboard] Error response:', err.response?.data);
@@ -2252,10 +2302,33 @@ export default function Dashboard() {
       }
       setLoading(false);
     }
-  }, [token, navigate, handleLogout]);
-
-  // Polling for pods - every 5 seconds, skip initial since useEffect handles it
-  usePolling(fetchPods, 5000, { enabled: !!token, skipInitial: true });
+  }, [token, navigate, handleLogout, applyPods]);
+
+  // Live pod updates via server-sent events (snapshot + added/modified/deleted)
+  const streamPodsRef = useRef(new Map());
+  const podStreamHandlers = useMemo(() => {
+    const upsert = (pod) => {
+      streamPodsRef.current.set(pod.name, pod);
+      applyPods(Array.from(streamPodsRef.current.values()));
+    };
+    return {
+      snapshot: (allPods) => {
+        streamPodsRef.current = new Map(allPods.map(p => [p.name, p]));
+        applyPods(allPods);
+      },
+      added: upsert,
+      modified: upsert,
+      deleted: ({ name }) => {
+        streamPodsRef.current.delete(name);
+        applyPods(Array.from(streamPodsRef.current.values()));
+      },
+    };
+  }, [applyPods]);
+  const streamUrl = token ? `${API_BASE}/pods/stream?access_token=${encodeURIComponent(token)}` : null;
+  const streamConnected = useEventStream(streamUrl, podStreamHandlers, { enabled: !!token });
+
+  // Polling for pods - every 5 seconds, only while the live stream is down
+  usePolling(fetchPods, 5000, { enabled: !!token && !streamConnected, skipInitial: true });
 
   // Initial fetch
   useEffect(() => {
@@ -53,6 +53,58 @@ export function usePolling(fetchFn, interval = POLLING_INTERVAL, options = {}) {
   }, [interval, enabled, skipInitial]);
 }
 
+// ============================================
+// useEventStream - Server-sent events
+// ============================================
+
+/**
+ * Subscribe to a server-sent events endpoint (streaming counterpart of usePolling)
+ * @param {string|null} url - Full stream URL; null disables the stream
+ * @param {Object} handlers - Map of event name -> handler(parsedData)
+ * @param {Object} options - Options: enabled (boolean)
+ * @returns {boolean} connected - true while the stream is open
+ */
+export function useEventStream(url, handlers, options = {}) {
+  const { enabled = true } = options;
+  const [connected, setConnected] = useState(false);
+  const savedHandlers = useRef(handlers);
+
+  // Remember the latest handlers
+  useEffect(() => {
+    savedHandlers.current = handlers;
+  }, [handlers]);
+
+  useEffect(() => {
+    if (!enabled || !url || typeof window.EventSource === 'undefined') return;
+
+    const source = new EventSource(url);
+
+    Object.keys(savedHandlers.current).forEach((eventName) => {
+      source.addEventListener(eventName, (event) => {
+        const handler = savedHandlers.current[eventName];
+        if (!handler) return;
+        try {
+          handler(JSON.parse(event.data));
+        } catch (error) {
+          console.error(`[useEventStream] Bad "${eventName}" event:`, error);
+        }
+      });
+    });
+
+    source.onopen = () => setConnected(true);
+    // EventSource reconnects by itself; callers fall back to polling while disconnected
+    source.onerror = () => setConnected(false);
+
+    // Cleanup on unmount
+    return () => {
+      source.close();
+      setConnected(false);
+    };
+  }, [url, enabled]);
+
+  return connected;
+}
+
 // ============================================
 // useAuth - Authentication hook
 // ============================================